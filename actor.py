@@ -0,0 +1,79 @@
+"""Single-writer host for a ``DifferEngine``.
+
+The actor runs one asyncio loop on a background thread and is the only
+thing that touches the engine: ticks and broker replies arrive there
+because the network client runs on the same loop, and commands from other
+threads (buttons, schedulers) are queued onto it with ``submit``. Readers
+never see the live engine, only the immutable snapshot the actor
+republishes at most ``publish_hz`` times a second.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from types import MappingProxyType
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class EngineActor:
+    def __init__(self, engine, publish_hz=20):
+        self.engine = engine
+        self.publish_interval = 1.0 / publish_hz
+        self.latest = freeze(engine.snapshot())
+        self.loop = None
+        self.thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def run_loop(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        self.loop.call_soon(self.publish)
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # Commands
+
+    def submit(self, method, *args):
+        # Runs engine.<method>(*args) on the actor thread, in submission
+        # order; the returned future carries its result
+        future = concurrent.futures.Future()
+        self.loop.call_soon_threadsafe(self.call, future, method, args)
+        return future
+
+    def call(self, future, method, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(getattr(self.engine, method)(*args))
+        except Exception as error:
+            future.set_exception(error)
+
+    def spawn(self, coroutine):
+        # Network clients run here so their callbacks share the actor thread
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    # Readers
+
+    def publish(self):
+        if self.engine.version != self.latest['version']:
+            self.latest = freeze(self.engine.snapshot())
+        self.loop.call_later(self.publish_interval, self.publish)
+
+    def snapshot(self):
+        return self.latest
@@ -0,0 +1,191 @@
+"""Market allocation policies for ``DifferEngine``.
+
+An allocator decides which market gets the next trade when the engine
+rotates a single active market. Each keeps its own per-market win/loss and
+profit tallies, updated once per settled contract.
+
+    greedy       the original rule: highest total profit, or a random other
+                 market with probability ``exploration``; re-run every
+                 ``market_switch_interval`` trades
+    ucb1         highest upper confidence bound on the win rate
+    thompson     highest draw from each market's Beta posterior
+    sw-ucb1      ucb1 counting only each market's last SLIDING_WINDOW results
+    sw-thompson  thompson over the same sliding window
+
+The bandit policies are asked again on every trade signal, and a signal is
+only traded if it came from the market they pick. Their counts start from
+``prior_weight`` pseudo-contracts at the win rate implied by the market's
+live digit distribution: a DIGITDIFF bet on the rarest digit loses about as
+often as that digit turns up.
+"""
+
+import math
+import random
+from collections import deque
+
+SLIDING_WINDOW = 50
+
+
+class MarketArm:
+    __slots__ = ('wins', 'losses', 'profit', 'outcomes')
+
+    def __init__(self, window=None):
+        self.wins = 0
+        self.losses = 0
+        self.profit = 0.0
+        self.outcomes = deque() if window else None
+
+    @property
+    def trials(self):
+        return self.wins + self.losses
+
+    def add(self, profit, window=None):
+        if profit > 0:
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.profit += profit
+
+        outcomes = self.outcomes
+        if outcomes is not None:
+            outcomes.append(profit)
+            if len(outcomes) > window:
+                # Forget the oldest result so the tallies cover the window
+                old = outcomes.popleft()
+                if old > 0:
+                    self.wins -= 1
+                else:
+                    self.losses -= 1
+                self.profit -= old
+
+
+class Allocator:
+    name = None
+    per_signal = True
+
+    def __init__(self, markets, window=None, prior_weight=2.0, prior_window=100):
+        self.markets = list(markets)
+        self.window = window
+        self.prior_weight = prior_weight
+        self.prior_window = prior_window
+        self.reset()
+
+    def reset(self):
+        self.arms = {market: MarketArm(self.window) for market in self.markets}
+
+    def update(self, market, profit):
+        arm = self.arms.get(market)
+        if arm is not None:
+            arm.add(profit, self.window)
+
+    def restore(self, performance, history):
+        # Rebuild the tallies of a resumed session: windowed arms from the
+        # settled trades themselves, the rest from the per-market totals
+        self.reset()
+        if self.window:
+            for trade in history:
+                self.update(trade['market'], trade['profit'])
+            return
+        for market, arm in self.arms.items():
+            totals = performance.get(market)
+            if totals:
+                arm.wins = totals['wins']
+                arm.losses = totals['losses']
+                arm.profit = totals['profit']
+
+    def prior(self, state):
+        # Win rate of a bet on the rarest digit seen in the prior window,
+        # Laplace-smoothed so an empty window gives the uniform 0.9
+        stats = state.digit_stats
+        size = self.prior_window if self.prior_window in stats.counts else stats.capacity
+        rarest = min(filter(None, stats.counts[size]), default=0)
+        return 1.0 - (rarest + 1) / (stats.filled(size) + 10)
+
+    def posteriors(self, engine):
+        # (market, wins, losses) with the digit prior folded in
+        weight = self.prior_weight
+        result = []
+        for market in self.markets:
+            arm = self.arms[market]
+            win_rate = self.prior(engine.markets[market])
+            result.append((market, arm.wins + weight * win_rate,
+                           arm.losses + weight * (1.0 - win_rate)))
+        return result
+
+    def select(self, engine):
+        raise NotImplementedError
+
+
+class GreedyAllocator(Allocator):
+    name = 'greedy'
+    per_signal = False
+
+    def __init__(self, markets, exploration=0.1):
+        self.exploration = exploration
+        super().__init__(markets)
+
+    def select(self, engine):
+        arms = self.arms
+        if all(arm.trials == 0 for arm in arms.values()):
+            return random.choice(self.markets)
+
+        best_market = max(self.markets, key=lambda m: arms[m].profit)
+
+        if random.random() < self.exploration:
+            other_markets = [m for m in self.markets if m != best_market]
+            if other_markets:
+                return random.choice(other_markets)
+
+        return best_market
+
+
+class UCB1Allocator(Allocator):
+    name = 'ucb1'
+
+    def __init__(self, markets, window=None, confidence=math.sqrt(2), **options):
+        self.confidence = confidence
+        super().__init__(markets, window, **options)
+
+    def select(self, engine):
+        posteriors = self.posteriors(engine)
+        log_total = math.log(sum(wins + losses for _, wins, losses in posteriors))
+        best_market = None
+        best_bound = -1.0
+        for market, wins, losses in posteriors:
+            trials = wins + losses
+            bound = wins / trials + self.confidence * math.sqrt(log_total / trials)
+            if bound > best_bound:
+                best_market = market
+                best_bound = bound
+        return best_market
+
+
+class ThompsonAllocator(Allocator):
+    name = 'thompson'
+
+    def select(self, engine):
+        best_market = None
+        best_draw = -1.0
+        for market, wins, losses in self.posteriors(engine):
+            draw = random.betavariate(wins, losses)
+            if draw > best_draw:
+                best_market = market
+                best_draw = draw
+        return best_market
+
+
+ALLOCATORS = {
+    'greedy': lambda markets, exploration: GreedyAllocator(markets, exploration),
+    'ucb1': lambda markets, exploration: UCB1Allocator(markets),
+    'thompson': lambda markets, exploration: ThompsonAllocator(markets),
+    'sw-ucb1': lambda markets, exploration: UCB1Allocator(markets, SLIDING_WINDOW),
+    'sw-thompson': lambda markets, exploration: ThompsonAllocator(markets, SLIDING_WINDOW)
+}
+
+
+def make_allocator(name, markets, exploration=0.1):
+    if name not in ALLOCATORS:
+        raise ValueError(f"unknown allocation policy: {name!r}")
+    allocator = ALLOCATORS[name](markets, exploration)
+    allocator.name = name
+    return allocator
@@ -0,0 +1,147 @@
+"""Offline backtester for the differ strategy.
+
+Replays recorded tick files (see ``tickstore``) through a paper-mode
+``DifferEngine``, so signals and DIGITDIFF settlement on the 5th tick come
+from exactly the code the app trades with.
+
+    python backtest.py ticks/ --markets R_10 R_50 --stake 1 --json
+"""
+
+import argparse
+import json
+import random
+import time
+
+from allocation import ALLOCATORS
+from engine import DifferEngine
+from tickstore import TickStore
+
+
+class Backtest:
+    def __init__(self, store, symbols=None, start_epoch=None, end_epoch=None,
+                 balance=1000.0, seed=None, **engine_params):
+        self.store = store
+        self.symbols = symbols or store.markets()
+        self.start_epoch = start_epoch
+        self.end_epoch = end_epoch
+        self.balance = balance
+        self.seed = seed
+        engine_params.setdefault('max_trades', float('inf'))
+        self.engine = DifferEngine(markets=self.symbols, paper=True, **engine_params)
+
+        # Equity curve summary
+        self.equity = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.engine.subscribe("settle", self.on_settle)
+
+    def on_settle(self, contract_id, profit, info):
+        self.equity += profit
+        if self.equity > self.peak:
+            self.peak = self.equity
+        elif self.peak - self.equity > self.max_drawdown:
+            self.max_drawdown = self.peak - self.equity
+
+    def run(self):
+        if self.seed is not None:
+            random.seed(self.seed)
+
+        engine = self.engine
+        engine.start()
+        engine.set_balance(self.balance)
+        engine.set_connected(True)
+
+        started = time.perf_counter()
+        ticks = self.store.replay(engine, self.symbols, self.start_epoch, self.end_epoch)
+        elapsed = time.perf_counter() - started
+        return self.result(ticks, elapsed)
+
+    def result(self, ticks, elapsed):
+        engine = self.engine
+        settled = engine.wins + engine.losses
+        return {
+            'ticks': ticks,
+            'seconds': elapsed,
+            'ticks_per_second': ticks / elapsed if elapsed else 0.0,
+            'trades': engine.trade_count,
+            'settled': settled,
+            'open': len(engine.pending_contracts),
+            'wins': engine.wins,
+            'losses': engine.losses,
+            'win_rate': engine.win_rate,
+            'profit_loss': engine.profit_loss,
+            'max_drawdown': self.max_drawdown,
+            'switches': engine.market_switch_counter,
+            'markets': {m: dict(p) for m, p in engine.market_performance.items()}
+        }
+
+
+def format_report(result):
+    lines = [
+        f"Ticks:        {result['ticks']} ({result['ticks_per_second']:,.0f}/s)",
+        f"Trades:       {result['trades']} ({result['open']} still open)",
+        f"Wins/Losses:  {result['wins']}/{result['losses']}",
+        f"Win Rate:     {result['win_rate']:.1f}%",
+        f"P&L:          ${result['profit_loss']:+.2f}",
+        f"Max Drawdown: ${result['max_drawdown']:.2f}",
+        f"Switches:     {result['switches']}",
+        "",
+        f"{'Market':<8}{'Wins':>6}{'Losses':>8}{'Profit':>10}"
+    ]
+    for market, perf in result['markets'].items():
+        lines.append(f"{market:<8}{perf['wins']:>6}{perf['losses']:>8}{perf['profit']:>+10.2f}")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Backtest the differ strategy on recorded ticks")
+    parser.add_argument('data', help="tick store directory")
+    parser.add_argument('--markets', nargs='+', help="markets to replay (default: all recorded)")
+    parser.add_argument('--start', type=int, help="first epoch to replay")
+    parser.add_argument('--end', type=int, help="stop before this epoch")
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--stake', type=float, default=1.0)
+    parser.add_argument('--max-trades', type=int)
+    parser.add_argument('--rarity-window', type=int, default=20)
+    parser.add_argument('--rarest-count', type=int, default=2)
+    parser.add_argument('--pattern-length', type=int, default=5)
+    parser.add_argument('--pattern-confirm', type=int, default=3)
+    parser.add_argument('--switch-interval', type=int, default=5)
+    parser.add_argument('--exploration', type=float, default=0.1)
+    parser.add_argument('--allocation', choices=sorted(ALLOCATORS), default='greedy',
+                        help="market allocation policy")
+    parser.add_argument('--seed', type=int, help="seed market selection for repeatable runs")
+    parser.add_argument('--json', action='store_true', help="print the result as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    params = {
+        'stake': args.stake,
+        'rarity_window': args.rarity_window,
+        'rarest_count': args.rarest_count,
+        'pattern_length': args.pattern_length,
+        'pattern_confirm': args.pattern_confirm,
+        'market_switch_interval': args.switch_interval,
+        'exploration': args.exploration,
+        'allocation': args.allocation
+    }
+    if args.max_trades is not None:
+        params['max_trades'] = args.max_trades
+
+    store = TickStore(args.data)
+    try:
+        result = Backtest(store, args.markets, args.start, args.end,
+                          balance=args.balance, seed=args.seed, **params).run()
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_report(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,383 @@
+"""Benchmarks for the tick-processing hot path and widget updates.
+
+    python benchmarks/bench.py                          # synthetic stream
+    python benchmarks/bench.py --ticks ticks/           # recorded ticks
+    python benchmarks/bench.py --save-baseline base.json
+    python benchmarks/bench.py --baseline base.json     # exit 1 on regression
+
+Every case runs once per tick of the stream. Untimed set-up for a tick
+(feeding history, opening the contract to settle, ...) happens outside the
+timed call, and the clock's own overhead is subtracted from each sample.
+A second, shorter pass under tracemalloc reports the bytes allocated per
+call.
+
+Cases:
+
+    decode            tickdecode.decode on a raw tick frame
+    process_tick      DifferEngine.on_tick end to end (paper trading)
+    detect_patterns   DifferEngine.detect_patterns
+    should_trade      DifferEngine.should_trade
+    select_<policy>   one market-allocation decision per policy
+    settle            on_contract_update booking a sold contract
+    color_box         ColorBox.update_colors plus a layout pass
+    performance_bar   MarketPerformanceBar.update_performance plus layout
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tickdecode
+from allocation import ALLOCATORS
+from engine import DEFAULT_MARKETS, DifferEngine
+from latency import LatencyHistogram
+
+WIDGET_CASES = ('color_box', 'performance_bar')
+
+# Relative slowdown in throughput or median latency counted as a regression
+DEFAULT_TOLERANCE = 0.15
+
+
+# Tick streams: lists of (symbol, epoch, quote, pip_size, digit)
+
+def synthetic_stream(count, markets=DEFAULT_MARKETS, seed=1):
+    rng = random.Random(seed)
+    stream = []
+    for index in range(count):
+        symbol = markets[index % len(markets)]
+        pip_size = 3 if symbol == "R_10" else 2
+        quote = round(rng.uniform(1000, 9000), pip_size)
+        stream.append((symbol, 1700000000 + index // len(markets), quote, pip_size,
+                       tickdecode.last_digit(quote, pip_size)))
+    return stream
+
+
+def recorded_ticks(store, symbol):
+    for epoch, quote, digit in store.ticks(symbol):
+        yield epoch, symbol, quote, digit
+
+
+def recorded_stream(root, count, markets=None):
+    # The first ``count`` recorded ticks across markets, in epoch order
+    from tickstore import TickStore
+    store = TickStore(root)
+    try:
+        merged = heapq.merge(*(recorded_ticks(store, symbol)
+                               for symbol in markets or store.markets()))
+        return [(symbol, epoch, quote, None, digit)
+                for epoch, symbol, quote, digit in itertools.islice(merged, count)]
+    finally:
+        store.close()
+
+
+def tick_frame(symbol, epoch, quote, pip_size):
+    tick = {"ask": quote, "bid": quote, "epoch": epoch, "id": "0f0e0d0c",
+            "pip_size": pip_size if pip_size is not None else 2,
+            "quote": quote, "symbol": symbol}
+    return json.dumps({"echo_req": {"ticks": symbol, "subscribe": 1}, "msg_type": "tick",
+                       "subscription": {"id": "0f0e0d0c"}, "tick": tick},
+                      separators=(',', ':'))
+
+
+def trading_engine(stream, **params):
+    markets = sorted({tick[0] for tick in stream})
+    engine = DifferEngine(markets=markets, paper=True, max_trades=float('inf'), **params)
+    engine.start()
+    engine.set_balance(1e9)
+    engine.set_connected(True)
+    return engine
+
+
+# Cases: each factory returns (items, step, call). ``step(item)`` is untimed
+# preparation, ``call(item)`` the measured operation.
+
+def case_decode(stream):
+    frames = [tick_frame(symbol, epoch, quote, pip_size)
+              for symbol, epoch, quote, pip_size, digit in stream]
+    return frames, None, tickdecode.decode
+
+
+def case_process_tick(stream):
+    on_tick = trading_engine(stream).on_tick
+    return stream, None, lambda tick: on_tick(tick[4], tick[0])
+
+
+def case_detect_patterns(stream):
+    engine = trading_engine(stream)
+    markets = engine.markets
+    push = engine.matcher.push
+
+    def step(tick):
+        state = markets[tick[0]]
+        state.history = push(state.history, tick[4])
+        state.seen += 1
+
+    return stream, step, lambda tick: engine.detect_patterns(markets[tick[0]])
+
+
+def case_should_trade(stream):
+    engine = trading_engine(stream)
+    markets = engine.markets
+    push = engine.matcher.push
+
+    def step(tick):
+        state = markets[tick[0]]
+        state.digit_stats.push(tick[4])
+        state.history = push(state.history, tick[4])
+        state.seen += 1
+        engine.detect_patterns(state)
+
+    return stream, step, lambda tick: engine.should_trade(markets[tick[0]], tick[4])
+
+
+def case_select(policy):
+    def factory(stream):
+        engine = trading_engine(stream, allocation=policy)
+        rng = random.Random(2)
+
+        def step(tick):
+            engine.markets[tick[0]].digit_stats.push(tick[4])
+            if rng.random() < 0.05:
+                engine.allocator.update(tick[0], 0.95 if rng.random() < 0.9 else -1.0)
+
+        return stream, step, lambda tick: engine.allocator.select(engine)
+    return factory
+
+
+def case_settle(stream):
+    engine = DifferEngine(markets=sorted({tick[0] for tick in stream}),
+                          max_trades=float('inf'))
+    engine.start()
+    engine.set_balance(1e9)
+    contract_ids = itertools.count(1)
+    current = {}
+
+    def step(tick):
+        contract_id = next(contract_ids)
+        order = {'market': tick[0], 'barrier': str(tick[4]), 'stake': 1.0}
+        engine.on_buy({"buy": {"contract_id": contract_id}}, order)
+        current['update'] = {'contract_id': contract_id, 'is_sold': 1,
+                             'profit': 0.95 if tick[4] % 3 else -1.0}
+
+    return stream, step, lambda tick: engine.on_contract_update(current['update'])
+
+
+def case_color_box(stream):
+    from panels import ColorBox
+    box = ColorBox()
+    recent = []
+
+    def step(tick):
+        recent.append("green" if tick[4] % 2 == 0 else "red")
+        del recent[:-15]
+
+    def call(tick):
+        box.update_colors(recent)
+        box.do_layout()
+
+    return stream, step, call
+
+
+def case_performance_bar(stream):
+    from panels import MarketPerformanceBar
+    bar = MarketPerformanceBar()
+    markets = sorted({tick[0] for tick in stream})
+    performance = {market: {'wins': 0, 'losses': 0, 'profit': 0.0} for market in markets}
+    current = {}
+
+    def step(tick):
+        # A fresh mapping per tick, as the UI gets from each snapshot
+        perf = performance[tick[0]]
+        perf['profit'] += 0.95 if tick[4] % 10 else -1.0
+        current['value'] = {market: dict(p) for market, p in performance.items()}
+
+    def call(tick):
+        bar.update_performance(current['value'], markets)
+        bar.do_layout()
+
+    return stream, step, call
+
+
+CASES = {
+    'decode': case_decode,
+    'process_tick': case_process_tick,
+    'detect_patterns': case_detect_patterns,
+    'should_trade': case_should_trade,
+    **{f"select_{policy}": case_select(policy) for policy in ALLOCATORS},
+    'settle': case_settle,
+    'color_box': case_color_box,
+    'performance_bar': case_performance_bar
+}
+
+
+# Harness
+
+def clock_overhead(samples=10000):
+    clock = time.perf_counter_ns
+    best = None
+    for _ in range(samples):
+        started = clock()
+        elapsed = clock() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_case(factory, stream, overhead):
+    items, step, call = factory(stream)
+    clock = time.perf_counter_ns
+    histogram = LatencyHistogram()
+    record = histogram.record
+    busy = 0
+    for item in items:
+        if step is not None:
+            step(item)
+        started = clock()
+        call(item)
+        elapsed = clock() - started - overhead
+        if elapsed < 0:
+            elapsed = 0
+        busy += elapsed
+        record(elapsed)
+    return histogram, busy
+
+
+def allocation_case(factory, stream, sample):
+    items, step, call = factory(stream[:sample])
+    total = 0
+    tracemalloc.start()
+    try:
+        for item in items:
+            if step is not None:
+                step(item)
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            call(item)
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / len(items) if items else 0.0
+
+
+def run_case(name, stream, overhead, alloc_sample):
+    factory = CASES[name]
+    histogram, busy = time_case(factory, stream, overhead)
+    return {
+        'calls': histogram.count,
+        'per_second': histogram.count / (busy / 1e9) if busy else 0.0,
+        'p50_ns': histogram.percentile(0.5),
+        'p99_ns': histogram.percentile(0.99),
+        'mean_ns': histogram.total / histogram.count if histogram.count else 0,
+        'alloc_bytes': allocation_case(factory, stream, alloc_sample)
+    }
+
+
+def environment(stream_name, count):
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'orjson': tickdecode.orjson is not None,
+        'stream': stream_name,
+        'ticks': count
+    }
+
+
+def compare(results, baseline, tolerance):
+    # (name, change in throughput, change in p50, regressed)
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        speed = result['per_second'] / base['per_second'] - 1 if base['per_second'] else 0.0
+        median = result['p50_ns'] / base['p50_ns'] - 1 if base['p50_ns'] else 0.0
+        rows.append((name, speed, median, speed < -tolerance or median > tolerance))
+    return rows
+
+
+def format_results(results, comparison=None):
+    changes = {name: (speed, median, regressed)
+               for name, speed, median, regressed in comparison or ()}
+    lines = [f"{'Case':<22}{'calls/s':>13}{'p50 ns':>9}{'p99 ns':>9}{'B/call':>9}"
+             + (f"{'vs base':>10}" if changes else "")]
+    for name, result in results.items():
+        line = (f"{name:<22}{result['per_second']:>13,.0f}{result['p50_ns']:>9,}"
+                f"{result['p99_ns']:>9,}{result['alloc_bytes']:>9,.0f}")
+        if name in changes:
+            speed, median, regressed = changes[name]
+            line += f"{speed:>+9.1%}" + (" REGRESSED" if regressed else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tick hot path and widget updates")
+    parser.add_argument('--ticks', help="tick store directory; default is a synthetic stream")
+    parser.add_argument('--markets', nargs='+')
+    parser.add_argument('--count', type=int, default=50000, help="ticks per case")
+    parser.add_argument('--alloc-sample', type=int, default=2000,
+                        help="ticks per case in the tracemalloc pass")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), metavar='CASE')
+    parser.add_argument('--no-widgets', action='store_true', help="skip the Kivy widget cases")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save-baseline', metavar='PATH', help="write these results as a baseline")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    if args.ticks:
+        stream = recorded_stream(args.ticks, args.count, args.markets)
+        stream_name = os.path.abspath(args.ticks)
+    else:
+        stream = synthetic_stream(args.count, tuple(args.markets or DEFAULT_MARKETS), args.seed)
+        stream_name = 'synthetic'
+
+    names = args.only or list(CASES)
+    if args.no_widgets:
+        names = [name for name in names if name not in WIDGET_CASES]
+    if any(name in WIDGET_CASES for name in names):
+        os.environ.setdefault('KIVY_NO_ARGS', '1')
+        os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+    overhead = clock_overhead()
+    results = {name: run_case(name, stream, overhead, args.alloc_sample) for name in names}
+    report = {'environment': environment(stream_name, len(stream)),
+              'clock_overhead_ns': overhead, 'results': results}
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        comparison = compare(results, baseline['results'], args.tolerance)
+        report['comparison'] = {name: {'per_second': speed, 'p50_ns': median, 'regressed': regressed}
+                                for name, speed, median, regressed in comparison}
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_results(results, comparison))
+
+    if comparison and any(regressed for *_, regressed in comparison):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
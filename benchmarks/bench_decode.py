@@ -0,0 +1,104 @@
+"""Tick frame decoding: json.loads versus the tickdecode paths.
+
+    python benchmarks/bench_decode.py [--frames 200000]
+
+Frames are shaped like real Deriv tick messages, with every few quotes
+landing on a trailing zero so the digit fix is exercised as well.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tickdecode
+
+SYMBOLS = ("R_10", "R_25", "R_50", "R_75", "R_100")
+
+
+def make_frames(count, seed=1):
+    rng = random.Random(seed)
+    frames = []
+    for index in range(count):
+        symbol = SYMBOLS[index % len(SYMBOLS)]
+        pip_size = 3 if symbol == "R_10" else 2
+        quote = round(rng.uniform(1000, 9000), pip_size)
+        frames.append(json.dumps({
+            "echo_req": {"ticks": symbol, "subscribe": 1},
+            "msg_type": "tick",
+            "subscription": {"id": "c1d2e3f4-0000-0000-0000-%012d" % index},
+            "tick": {"ask": quote + 0.1, "bid": quote - 0.1, "epoch": 1700000000 + index,
+                     "id": "c1d2e3f4", "pip_size": pip_size, "quote": quote, "symbol": symbol}
+        }, separators=(',', ':')))
+    return frames
+
+
+def legacy(message):
+    data = json.loads(message)
+    if data.get("msg_type") == "tick":
+        tick = data["tick"]
+        return tick["symbol"], tick["epoch"], int(str(tick["quote"])[-1])
+
+
+def full_json(message):
+    data = json.loads(message)
+    if data.get("msg_type") == "tick":
+        tick = tickdecode.complete_tick(data["tick"])
+        return tick["symbol"], tick["epoch"], tick["digit"]
+
+
+def backend(message):
+    tick, data = tickdecode.decode_full(message)
+    return tick["symbol"], tick["epoch"], tick["digit"]
+
+
+def scanner(message):
+    tick, data = tickdecode.decode_scanned(message)
+    return tick["symbol"], tick["epoch"], tick["digit"]
+
+
+def measure(function, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for message in frames:
+            function(message)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(frames) / best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--frames', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    frames = make_frames(args.frames)
+    expected = [full_json(message) for message in frames]
+    assert [scanner(message) for message in frames] == expected
+    wrong = sum(legacy(message) != result for message, result in zip(frames, expected))
+
+    cases = [("json.loads + str(quote)[-1]", legacy),
+             ("json.loads + pip_size digit", full_json),
+             ("tickdecode scanner", scanner)]
+    if tickdecode.orjson is not None:
+        assert [backend(message) for message in frames] == expected
+        cases.append(("tickdecode orjson", backend))
+
+    baseline = None
+    print(f"{'Decoder':<32}{'frames/s':>12}{'speedup':>10}")
+    for name, function in cases:
+        rate = measure(function, frames, args.repeat)
+        baseline = baseline or rate
+        print(f"{name:<32}{rate:>12,.0f}{rate / baseline:>9.2f}x")
+    print(f"\nstr(quote)[-1] got {wrong} of {len(frames)} digits wrong "
+          f"({wrong / len(frames):.1%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Cold-start timings for the Kivy app.
+
+    python benchmarks/bench_startup.py                        # 5 cold starts
+    python benchmarks/bench_startup.py --save-baseline startup.json
+    python benchmarks/bench_startup.py --baseline startup.json   # exit 1 on regression
+
+Every run is a fresh interpreter that launches the app on an empty data
+directory and quits as soon as startup has finished. Stages are seconds
+since the first line of ``differsmatch``, except ``process``:
+
+    imports      module-level imports done
+    build        first screen built
+    first_frame  first frame drawn
+    panels       remaining panels built
+    engine       engine, journal and actor loaded (off the main thread)
+    process      interpreter spawn to first frame
+
+The median of each stage is reported and compared against a baseline.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = ('imports', 'build', 'first_frame', 'panels', 'engine', 'process')
+
+# Relative slowdown of a stage's median counted as a regression
+DEFAULT_TOLERANCE = 0.25
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+import differsmatch
+
+class Bot(differsmatch.SmartMarketDifferBot):
+    def report_startup(self, timings):
+        timings = dict(timings)
+        first_frame = time.time() - (time.perf_counter() - differsmatch.STARTED - timings['first_frame'])
+        timings['process'] = first_frame - {spawned!r}
+        print(json.dumps(timings), flush=True)
+        differsmatch.App.get_running_app().stop()
+
+class BenchApp(differsmatch.SmartMarketDifferBotApp):
+    def build(self):
+        return Bot(data_dir={data_dir!r})
+
+BenchApp().run()
+"""
+
+
+def cold_start(timeout):
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+        # Kivy looks up the app class's source file, so ``-c`` will not do
+        script = os.path.join(data_dir, 'start.py')
+        spawned = time.time()
+        with open(script, 'w') as handle:
+            handle.write(CHILD.format(root=ROOT, spawned=spawned, data_dir=data_dir))
+        result = subprocess.run([sys.executable, script], env=env, capture_output=True,
+                                text=True, timeout=timeout)
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise RuntimeError(f"app did not report startup timings:\n{result.stderr[-2000:]}")
+
+
+def summarize(runs):
+    return {stage: statistics.median(run[stage] for run in runs) for stage in STAGES}
+
+
+def compare(medians, baseline, tolerance):
+    # (stage, relative change, regressed)
+    rows = []
+    for stage, value in medians.items():
+        base = baseline.get(stage)
+        if not base:
+            continue
+        change = value / base - 1
+        rows.append((stage, change, change > tolerance))
+    return rows
+
+
+def format_results(medians, runs, comparison=None):
+    changes = {stage: (change, regressed) for stage, change, regressed in comparison or ()}
+    lines = [f"{'Stage':<14}{'median ms':>11}{'min ms':>9}{'max ms':>9}"
+             + (f"{'vs base':>10}" if changes else "")]
+    for stage, value in medians.items():
+        values = [run[stage] for run in runs]
+        line = f"{stage:<14}{value * 1000:>11.1f}{min(values) * 1000:>9.1f}{max(values) * 1000:>9.1f}"
+        if stage in changes:
+            change, regressed = changes[stage]
+            line += f"{change:>+9.1%}" + (" REGRESSED" if regressed else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the app's cold-start timings")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60.0, help="seconds allowed per run")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save-baseline', metavar='PATH', help="write these results as a baseline")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    runs = [cold_start(args.timeout) for _ in range(args.runs)]
+    medians = summarize(runs)
+    report = {'python': sys.version.split()[0], 'runs': runs, 'medians': medians}
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+        comparison = compare(medians, baseline['medians'], args.tolerance)
+        report['comparison'] = {stage: {'change': change, 'regressed': regressed}
+                                for stage, change, regressed in comparison}
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_results(medians, runs, comparison))
+
+    if comparison and any(regressed for *_, regressed in comparison):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""asyncio client for the Deriv WebSocket API.
+
+One connection carries every tick subscription at once. Ticks are routed
+to ``on("tick", ...)`` listeners with their symbol, and request replies go
+back to the callback registered for their ``req_id``. ``send`` is safe to
+call from any thread; frames are written by a single writer task in order.
+
+``run`` supervises the connection until ``close`` is called: dropped
+sessions are retried with jittered exponential backoff, re-authorized and
+have their tick subscriptions replayed before ``recovered`` fires. A link
+that goes quiet without closing is caught by protocol pings: no pong within
+``ping_timeout`` closes the socket and starts a reconnect.
+Without a token the session is ready as soon as it opens (ticks only).
+The last ``close`` event comes with ``running`` already False, even when
+``close`` is called between sessions, so listeners can release what the
+session held.
+
+Exceptions raised by listeners and reply callbacks, and frames that fail
+to decode, are reported through ``error`` listeners and the session
+carries on.
+
+Frames are decoded by ``tickdecode.decode``, which takes a short path for
+ticks; tick listeners get the last ``digit`` already worked out from
+``pip_size``.
+
+Setting ``probes`` to a ``latency.LatencyProbes`` times frame decoding,
+tick dispatch and the buy round trip.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import defaultdict, deque
+
+import websockets
+
+from tickdecode import decode
+
+WS_ENDPOINT = "wss://ws.derivws.com/websockets/v3?app_id=1089"
+
+# Marks a frame that failed to decode
+BAD_FRAME = object()
+
+
+class ProbedFrame(str):
+    # A buy frame tagged with its req_id for send-queue timing
+    def __new__(cls, frame, req_id):
+        text = super().__new__(cls, frame)
+        text.req_id = req_id
+        return text
+
+
+class DerivClient:
+    def __init__(self, endpoint=WS_ENDPOINT, token="", backoff_base=0.5,
+                 backoff_max=30.0, keepalive_interval=30.0, ping_interval=20.0,
+                 ping_timeout=20.0):
+        self.endpoint = endpoint
+        self.token = token
+        self.listeners = defaultdict(list)
+
+        self.req_ids = itertools.count(1)
+        self.callbacks = {}
+        self.tick_symbols = []
+
+        self.loop = None
+        self.ws = None
+        self.outbox = None
+        self.running = False
+        self.ready = False
+        # Whether the last close listeners saw was the final one
+        self.closed = True
+        self.backoff = None
+
+        # Reconnect supervision
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.keepalive_interval = keepalive_interval
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.attempt = 0
+        self.disconnected_at = None
+        self.reconnects = 0
+        self.recovery_times = deque(maxlen=100)
+
+        # Optional latency probes
+        self.probes = None
+        self.receipt = (None, 0)
+        self.buys = {}
+
+    # Listeners: open, authorize, tick, error, close, recovered
+
+    def on(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            if event == "error":
+                callback(*args)
+            else:
+                self.call(callback, *args)
+
+    def call(self, callback, *args):
+        # A failing listener or reply callback is reported, not allowed to
+        # end the session it was called from
+        try:
+            callback(*args)
+        except Exception as error:
+            self.emit("error", {"code": "CallbackFailed",
+                                "message": f"{type(error).__name__}: {error}"})
+
+    # Requests
+
+    def send(self, payload, callback=None, persistent=False, market=None):
+        # Replies carrying this req_id go to ``callback``; persistent
+        # callbacks stay registered for subscription streams
+        req_id = next(self.req_ids)
+        payload = dict(payload, req_id=req_id)
+        if callback is not None:
+            self.callbacks[req_id] = (callback, persistent)
+        frame = json.dumps(payload)
+        if self.probes is not None and "buy" in payload:
+            market = market or payload.get("parameters", {}).get("symbol")
+            frame = self.probe_buy(market, req_id, frame)
+        self.post(frame)
+        return req_id
+
+    def buy(self, payload, market, callback):
+        # A buy by parameters or by proposal id; ``market`` labels the
+        # latency probes, as a proposal id does not name its symbol
+        return self.send(payload, callback, market=market)
+
+    def probe_buy(self, market, req_id, frame):
+        now = time.perf_counter_ns()
+        symbol, received = self.receipt
+        if received and symbol == market:
+            self.probes.record(market, "quote_to_buy", now - received)
+        self.buys[req_id] = (market, now)
+        # The writer spots tagged frames by identity to time the queue
+        return ProbedFrame(frame, req_id)
+
+    def post(self, frame):
+        if self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self.outbox.put_nowait, frame)
+
+    def forget(self, req_id):
+        self.callbacks.pop(req_id, None)
+
+    def subscribe_ticks(self, symbols):
+        for symbol in symbols:
+            if symbol not in self.tick_symbols:
+                self.tick_symbols.append(symbol)
+                if self.ready:
+                    self.send({"ticks": symbol, "subscribe": 1})
+
+    # Connection
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        self.closed = False
+
+        while self.running:
+            try:
+                await self.session()
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as error:
+                self.emit("error", {"code": "ConnectionFailed", "message": str(error)})
+
+            if not self.running:
+                break
+
+            if self.disconnected_at is None:
+                self.disconnected_at = time.monotonic()
+            self.backoff = asyncio.ensure_future(asyncio.sleep(self.next_backoff()))
+            try:
+                await self.backoff
+            except asyncio.CancelledError:
+                # ``close`` cuts the wait short; anything else is ours to raise
+                if self.running:
+                    raise
+            finally:
+                self.backoff = None
+
+        # Stopped between sessions: listeners still get their final close,
+        # with ``running`` already False
+        if not self.closed:
+            self.closed = True
+            self.emit("close")
+
+    def next_backoff(self):
+        # Full jitter: uniform over [0, min(max, base * 2^attempt)]
+        delay = min(self.backoff_max, self.backoff_base * (2 ** self.attempt))
+        self.attempt += 1
+        return random.uniform(0, delay)
+
+    async def session(self):
+        self.outbox = asyncio.Queue()
+        self.ready = False
+
+        # Protocol pings close a half-open socket that stays silent for
+        # ping_timeout, so the receive loop ends and the session is retried
+        async with websockets.connect(self.endpoint, ping_interval=self.ping_interval,
+                                      ping_timeout=self.ping_timeout) as ws:
+            self.ws = ws
+            if self.token:
+                self.send({"authorize": self.token}, self.on_authorize)
+            else:
+                self.on_ready()
+            self.emit("open")
+
+            tasks = [
+                asyncio.ensure_future(self.write_loop(ws)),
+                asyncio.ensure_future(self.keepalive_loop())
+            ]
+            try:
+                async for message in ws:
+                    self.dispatch(message)
+            except websockets.ConnectionClosed:
+                pass
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self.ws = None
+                self.ready = False
+                self.disconnected_at = time.monotonic()
+                self.fail_pending()
+                self.closed = not self.running
+                self.emit("close")
+
+    async def write_loop(self, ws):
+        while True:
+            frame = await self.outbox.get()
+            await ws.send(frame)
+            if type(frame) is ProbedFrame and frame.req_id in self.buys:
+                market, queued = self.buys[frame.req_id]
+                self.probes.record(market, "send_queue", time.perf_counter_ns() - queued)
+
+    async def keepalive_loop(self):
+        # Deriv drops sockets that send no API request for two minutes;
+        # protocol pings alone do not count
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            self.send({"ping": 1})
+
+    def fail_pending(self):
+        # In-flight requests will never get a reply on the old socket
+        callbacks = self.callbacks
+        self.callbacks = {}
+        self.buys.clear()
+        error = {"error": {"code": "Disconnected", "message": "Connection lost before reply"}}
+        for req_id, (callback, persistent) in callbacks.items():
+            if not persistent:
+                self.call(callback, dict(error, req_id=req_id))
+
+    def close(self):
+        self.running = False
+        if self.loop is None:
+            return
+        if self.ws is not None:
+            asyncio.run_coroutine_threadsafe(self.ws.close(), self.loop)
+        self.loop.call_soon_threadsafe(self.wake)
+
+    def wake(self):
+        if self.backoff is not None:
+            self.backoff.cancel()
+
+    def on_authorize(self, data):
+        if "error" in data:
+            self.emit("error", data["error"])
+            return
+        self.on_ready(data["authorize"])
+
+    def on_ready(self, account=None):
+        self.ready = True
+        self.attempt = 0
+        for symbol in self.tick_symbols:
+            self.send({"ticks": symbol, "subscribe": 1})
+        if account is not None:
+            self.emit("authorize", account)
+
+        if self.disconnected_at is not None:
+            downtime = time.monotonic() - self.disconnected_at
+            self.disconnected_at = None
+            self.reconnects += 1
+            self.recovery_times.append(downtime)
+            self.emit("recovered", downtime)
+
+    def track_contract(self, contract_id, callback):
+        # Streams proposal_open_contract updates to ``callback`` until the
+        # contract is sold, then drops the subscription
+        def on_update(reply):
+            contract = reply.get("proposal_open_contract")
+            if "error" in reply or not contract:
+                self.forget(reply.get("req_id"))
+                if "error" in reply:
+                    self.emit("error", reply["error"])
+                return
+            callback(contract)
+            if contract.get("is_sold"):
+                self.forget(reply.get("req_id"))
+                subscription = reply.get("subscription", {}).get("id")
+                if subscription:
+                    self.send({"forget": subscription})
+
+        return self.send(
+            {"proposal_open_contract": 1, "contract_id": contract_id, "subscribe": 1},
+            on_update, persistent=True
+        )
+
+    def fetch_contracts(self, since, callback):
+        # Calls ``callback(open, sold)`` with the account's open contracts
+        # (portfolio) and those sold since ``since`` (profit_table) once
+        # both replies are in; nothing is called if either request fails
+        replies = {}
+
+        def collect(kind, key, reply):
+            if "error" in reply:
+                self.emit("error", reply["error"])
+                return
+            replies[kind] = reply[kind].get(key, [])
+            if len(replies) == 2:
+                callback(replies["portfolio"], replies["profit_table"])
+
+        self.send({"portfolio": 1}, lambda reply: collect("portfolio", "contracts", reply))
+        self.send({"profit_table": 1, "description": 1, "sort": "DESC", "limit": 100,
+                   "date_from": int(since or time.time()) - 1},
+                  lambda reply: collect("profit_table", "transactions", reply))
+
+    def metrics(self):
+        times = sorted(self.recovery_times)
+        return {
+            'reconnects': self.reconnects,
+            'last_recovery': self.recovery_times[-1] if times else None,
+            'median_recovery': times[len(times) // 2] if times else None,
+            'max_recovery': times[-1] if times else None
+        }
+
+    def dispatch(self, message):
+        if self.probes is not None:
+            return self.dispatch_probed(message)
+
+        tick, data = self.parse(message)
+        if data is BAD_FRAME:
+            return
+        if tick is None:
+            self.dispatch_reply(data)
+            return
+
+        self.emit("tick", tick["symbol"], tick)
+
+    def parse(self, message):
+        # A frame that does not decode is reported and skipped; it must not
+        # end the session
+        try:
+            return decode(message)
+        except (ValueError, TypeError, AttributeError, KeyError) as error:
+            self.emit("error", {"code": "BadFrame", "message": f"{type(error).__name__}: {error}"})
+            return None, BAD_FRAME
+
+    def dispatch_probed(self, message):
+        clock = time.perf_counter_ns
+        received = clock()
+        tick, data = self.parse(message)
+        decoded = clock()
+        if data is BAD_FRAME:
+            return
+
+        if tick is not None:
+            symbol = tick["symbol"]
+            self.probes.record(symbol, "decode", decoded - received)
+            self.receipt = (symbol, received)
+            self.emit("tick", symbol, tick)
+            self.receipt = (None, 0)
+            self.probes.record(symbol, "on_message", clock() - received)
+            return
+
+        buy = self.buys.pop(data.get("req_id"), None)
+        if buy is not None:
+            market, queued = buy
+            self.probes.record(market, "buy_ack", received - queued)
+        self.dispatch_reply(data)
+
+    def dispatch_reply(self, data):
+        entry = self.callbacks.get(data.get("req_id"))
+        if entry is not None:
+            callback, persistent = entry
+            if not persistent:
+                del self.callbacks[data["req_id"]]
+            self.call(callback, data)
+        elif "error" in data:
+            self.emit("error", data["error"])
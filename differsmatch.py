@@ -1,3 +1,19 @@
+import time
+
+# Startup is timed from here; see SmartMarketDifferBot.report_startup
+STARTED = time.perf_counter()
+
+from kivy.config import Config
+from kivy.utils import platform
+
+# Desktop testing size, set before the window is created so it opens at
+# this size instead of being resized after the first frame
+if platform not in ('android', 'ios'):
+    Config.set('graphics', 'width', '400')
+    Config.set('graphics', 'height', '700')
+
+# Only what the first screen needs is imported here; panels, the engine,
+# the journal and the network client are imported after the first frame
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
@@ -7,176 +23,195 @@ from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
 from kivy.uix.spinner import Spinner
 from kivy.clock import Clock, mainthread
-from kivy.graphics import Color, Rectangle
 from kivy.core.window import Window
 from kivy.metrics import dp
 import json
+import logging
+import logging.handlers
+import os
 import threading
-import websocket
-import time
-from collections import deque, Counter
-import random
+from collections import deque
 
-# Set window size for testing (remove for mobile)
-Window.size = (400, 700)
+IMPORTED = time.perf_counter()
 
-WS_ENDPOINT = "wss://ws.derivws.com/websockets/v3?app_id=1089"
+# Point at a local simulator (see simulator.py) for load testing; None is
+# the public endpoint
+ENDPOINT = os.environ.get('DERIV_ENDPOINT')
 
-class ColorBox(BoxLayout):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.orientation = 'horizontal'
-        self.size_hint_y = None
-        self.height = dp(30)
-        self.spacing = dp(2)
-        
-    def update_colors(self, colors):
-        self.clear_widgets()
-        for color in colors:
-            box = Label()
-            box.size_hint_x = 1.0 / max(len(colors), 1)
-            with box.canvas.before:
-                if color == 'green':
-                    Color(0, 0.8, 0, 1)
-                else:
-                    Color(0.8, 0, 0, 1)
-                box.rect = Rectangle(pos=box.pos, size=box.size)
-            box.bind(pos=self.update_rect, size=self.update_rect)
-            self.add_widget(box)
-    
-    def update_rect(self, instance, value):
-        instance.rect.pos = instance.pos
-        instance.rect.size = instance.size
+# Upper bound on how often engine state is pushed into widgets
+UI_REFRESH_HZ = 10
 
-class LogArea(ScrollView):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.size_hint_y = None
-        self.height = dp(200)
-        self.layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=dp(2))
-        self.layout.bind(minimum_height=self.layout.setter('height'))
-        self.add_widget(self.layout)
-        
-    def add_log(self, message, color=(1, 1, 1, 1)):
-        log_label = Label(
-            text=f"[{time.strftime('%H:%M:%S')}] {message}",
-            size_hint_y=None,
-            height=dp(30),
-            color=color,
-            text_size=(Window.width - dp(20), None),
-            halign='left',
-            valign='middle'
-        )
-        self.layout.add_widget(log_label)
-        self.scroll_y = 0
+# Latency panel refresh and metrics file export, in seconds
+LATENCY_REFRESH_INTERVAL = 1.0
+LATENCY_EXPORT_INTERVAL = 30.0
 
-class MarketPerformanceBar(BoxLayout):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.orientation = 'horizontal'
-        self.size_hint_y = None
-        self.height = dp(100)
-        self.spacing = dp(5)
-        self.padding = dp(5)
-        
-    def update_performance(self, market_performance, available_markets):
-        self.clear_widgets()
-        
-        max_profit = max(abs(market_performance[m]['profit']) for m in available_markets)
-        if max_profit == 0:
-            max_profit = 1
-            
-        for market in available_markets:
-            perf = market_performance[market]
-            profit = perf['profit']
-            
-            bar_layout = BoxLayout(orientation='vertical', size_hint_x=1)
-            
-            # Profit label
-            profit_label = Label(
-                text=f"${profit:.2f}",
-                size_hint_y=0.2,
-                font_size=dp(10)
-            )
-            
-            # Bar container
-            bar_container = BoxLayout(size_hint_y=0.6)
-            bar = Label()
-            
-            # Calculate bar height ratio
-            height_ratio = abs(profit) / max_profit if max_profit > 0 else 0
-            
-            with bar.canvas.before:
-                if profit >= 0:
-                    Color(0, 0.8, 0, 1)
-                else:
-                    Color(0.8, 0, 0, 1)
-                bar.rect = Rectangle(pos=bar.pos, size=bar.size)
-            
-            bar.bind(pos=self.update_bar_rect, size=self.update_bar_rect)
-            bar_container.add_widget(bar)
-            
-            # Market label
-            market_label = Label(
-                text=market,
-                size_hint_y=0.2,
-                font_size=dp(10),
-                bold=True
-            )
-            
-            bar_layout.add_widget(profit_label)
-            bar_layout.add_widget(bar_container)
-            bar_layout.add_widget(market_label)
-            
-            self.add_widget(bar_layout)
+LATENCY_STAGES = (
+    ('decode', 'Decode'),
+    ('process_tick', 'Process'),
+    ('quote_to_buy', 'Quote>Buy'),
+    ('buy_ack', 'Buy ack')
+)
+
+LOG_LEVELS = {
+    "error": logging.ERROR,
+    "warning": logging.WARNING,
+    "success": logging.INFO,
+    "market": logging.INFO,
+    "info": logging.INFO,
+    "debug": logging.DEBUG
+}
+
+LOG_COLORS = {
+    "error": (1, 0, 0, 1),
+    "success": (0, 1, 0, 1),
+    "warning": (1, 0.6, 0, 1),
+    "market": (0.2, 0.5, 1, 1),
+    "info": (1, 1, 1, 1)
+}
+
+logger = logging.getLogger("differbot")
+
+def setup_file_logging(data_dir, max_bytes=1024 * 1024, backups=3):
+    log_dir = os.path.join(data_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, 'bot.log'), maxBytes=max_bytes, backupCount=backups
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+PATTERN_LABELS = {
+    "alternating": "Alternating",
+    "red_streak": "Red Streak",
+    "green_streak": "Green Streak",
+    "mixed": "Mixed"
+}
+
+class LogBuffer:
+    # Log rows kept from the first line on; the LogArea panel renders them
+    # once it is built. Safe from any thread.
+    def __init__(self, capacity=500):
+        self.entries = deque(maxlen=capacity)
+        self.pending = False
     
-    def update_bar_rect(self, instance, value):
-        instance.rect.pos = instance.pos
-        instance.rect.size = instance.size
+    def add_log(self, message, color=(1, 1, 1, 1)):
+        self.entries.append({
+            'text': f"[{time.strftime('%H:%M:%S')}] {message}",
+            'color': color,
+            'text_size': (Window.width - dp(20), None),
+            'halign': 'left',
+            'valign': 'middle'
+        })
+        self.pending = True
 
 class SmartMarketDifferBot(BoxLayout):
-    def __init__(self, **kwargs):
+    def __init__(self, data_dir='.', log_level=logging.INFO, endpoint=ENDPOINT, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'vertical'
         self.padding = dp(10)
         self.spacing = dp(10)
         
-        # Trading variables
-        self.ws = None
-        self.running = False
+        self.client = None
+        self.pipeline = None
+        self.session = None
+        self.recorder = None
         self.token = ""
-        self.available_markets = ["R_10", "R_25", "R_50", "R_75", "R_100"]
-        self.current_market = "R_10"
-        self.stake = 1.0
-        self.trade_count = 0
-        self.max_trades = 10
-        self.balance = 0.0
-        self.profit_loss = 0.0
-        self.win_rate = 0.0
-        self.wins = 0
-        self.losses = 0
-        
-        # Market performance tracking
-        self.market_performance = {market: {'wins': 0, 'losses': 0, 'profit': 0.0} 
-                                  for market in self.available_markets}
-        self.market_switch_counter = 0
-        self.market_switch_interval = 5
-        
-        # Market analysis
-        self.last_digits = deque(maxlen=100)
-        self.digit_counts = Counter()
-        self.rarest_digits = []
-        self.color_history = deque(maxlen=15)
-        self.pattern_history = deque(maxlen=10)
-        
-        # Trade tracking
-        self.trade_history = []
-        self.pending_contracts = {}
-        self.start_time = None
+        self.data_dir = data_dir
+        self.endpoint = endpoint
+        self.log_level = log_level
+        self.ui_refresh_interval = 1.0 / UI_REFRESH_HZ
+        self.rendered_version = -1
+        self.log_buffer = LogBuffer()
+        self.timings = {'imports': IMPORTED - STARTED}
+        
+        # Filled in after the first frame: panels on the main thread, the
+        # engine, actor and journal on a loader thread
+        self.engine = None
+        self.actor = None
+        self.journal = None
+        self.probes = None
+        self.perf_bar = None
+        self.color_box = None
+        self.log_area = None
+        self.latency_labels = {}
+        self.resume = False
+        self.resume_paper = None
         
         self.build_ui()
-        
+        self.timings['build'] = time.perf_counter() - STARTED
+        Window.bind(on_flip=self.on_first_frame)
+        Clock.schedule_interval(self.refresh_ui, self.ui_refresh_interval)
+        
+    def on_first_frame(self, window):
+        window.unbind(on_flip=self.on_first_frame)
+        self.timings['first_frame'] = time.perf_counter() - STARTED
+        threading.Thread(target=self.load_engine, name='engine-loader', daemon=True).start()
+        Clock.schedule_once(self.build_panels)
+    
+    def load_engine(self):
+        # Loader thread: nothing else touches the engine until the actor starts
+        from actor import EngineActor
+        from engine import DifferEngine
+        from journal import Journal
+        from latency import LatencyProbes
+        
+        # Strategy state lives in the headless engine, owned by the actor
+        # thread; this widget only submits commands and renders snapshots
+        engine = DifferEngine()
+        actor = EngineActor(engine)
+        
+        # Always-on stage timing; see latency.py for the stage list
+        probes = LatencyProbes()
+        probes.instrument(engine)
+        engine.subscribe("log", self.log)
+        
+        # Pick up the session a killed app left behind before anything can
+        # write to the engine; the next Start resumes it
+        journal = Journal(os.path.join(self.data_dir, 'journal'))
+        recovery = journal.recover(engine)
+        journal.attach(engine)
+        if recovery['active']:
+            self.log(f"Recovered session in {recovery['seconds'] * 1000:.0f}ms: "
+                     f"{recovery['trades']} trades, {recovery['pending']} open contracts", "warning")
+        
+        actor.start()
+        actor.spawn(journal.flush_loop())
+        self.engine_loaded(engine, actor, journal, probes, recovery['active'], recovery['paper'])
+    
+    @mainthread
+    def engine_loaded(self, engine, actor, journal, probes, resume, resume_paper):
+        self.engine = engine
+        self.actor = actor
+        self.journal = journal
+        self.probes = probes
+        self.resume = resume
+        # A recovered session only resumes in the mode it was traded in
+        self.resume_paper = resume_paper if resume else None
+        if self.resume_paper is not None:
+            self.mode_spinner.text = 'Paper' if self.resume_paper else 'Live'
+        self.start_btn.disabled = False
+        Clock.schedule_interval(self.refresh_latency, LATENCY_REFRESH_INTERVAL)
+        Clock.schedule_interval(self.export_latency, LATENCY_EXPORT_INTERVAL)
+        self.timings['engine'] = time.perf_counter() - STARTED
+        self.startup_step()
+    
+    def startup_step(self):
+        # Reported once both the panels and the engine are in
+        if 'engine' in self.timings and 'panels' in self.timings:
+            self.report_startup(self.timings)
+    
+    def report_startup(self, timings):
+        self.log("Startup: " + ", ".join(f"{stage} {seconds * 1000:.0f}ms"
+                                         for stage, seconds in timings.items()))
+        metrics_dir = os.path.join(self.data_dir, 'metrics')
+        os.makedirs(metrics_dir, exist_ok=True)
+        with open(os.path.join(metrics_dir, 'startup.json'), 'w') as handle:
+            json.dump(timings, handle, indent=2)
+    
     def build_ui(self):
+        # The first screen only; build_panels adds the rest below it
         # Header
         header = Label(
             text='Smart Market Differ Bot',
@@ -194,7 +229,11 @@ class SmartMarketDifferBot(BoxLayout):
         content.bind(minimum_height=content.setter('height'))
         
         # Configuration section
-        config_grid = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(160))
+        config_grid = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(200))
+        
+        config_grid.add_widget(Label(text='Mode:', size_hint_x=0.4))
+        self.mode_spinner = Spinner(text='Live', values=('Live', 'Paper'), size_hint_x=0.6)
+        config_grid.add_widget(self.mode_spinner)
         
         config_grid.add_widget(Label(text='API Token:', size_hint_x=0.4))
         self.token_input = TextInput(password=True, multiline=False, size_hint_x=0.6)
@@ -237,7 +276,8 @@ class SmartMarketDifferBot(BoxLayout):
         # Control buttons
         btn_layout = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(100))
         
-        self.start_btn = Button(text='Start Bot', background_color=(0.2, 0.7, 0.3, 1))
+        # Enabled once the engine has loaded
+        self.start_btn = Button(text='Start Bot', disabled=True, background_color=(0.2, 0.7, 0.3, 1))
         self.start_btn.bind(on_press=self.start_bot)
         btn_layout.add_widget(self.start_btn)
         
@@ -268,6 +308,14 @@ class SmartMarketDifferBot(BoxLayout):
         
         content.add_widget(analysis_grid)
         
+        scroll.add_widget(content)
+        self.add_widget(scroll)
+        self.content = content
+    
+    def build_panels(self, dt):
+        from panels import ColorBox, LogArea, MarketPerformanceBar
+        content = self.content
+        
         # Market performance
         perf_label = Label(text='Market Performance', size_hint_y=None, height=dp(30), bold=True)
         content.add_widget(perf_label)
@@ -286,324 +334,234 @@ class SmartMarketDifferBot(BoxLayout):
         log_label = Label(text='Activity Log', size_hint_y=None, height=dp(30), bold=True)
         content.add_widget(log_label)
         
-        self.log_area = LogArea()
+        self.log_area = LogArea(self.log_buffer)
         content.add_widget(self.log_area)
         
-        scroll.add_widget(content)
-        self.add_widget(scroll)
+        # Latency
+        latency_label = Label(text='Latency p50 / p99 (ms)', size_hint_y=None, height=dp(30), bold=True)
+        content.add_widget(latency_label)
+        
+        latency_grid = GridLayout(cols=2, spacing=dp(5), size_hint_y=None, height=dp(30) * len(LATENCY_STAGES))
+        self.latency_labels = {}
+        for stage, title in LATENCY_STAGES:
+            latency_grid.add_widget(Label(text=f'{title}:', size_hint_x=0.4))
+            self.latency_labels[stage] = Label(text='-', size_hint_x=0.6)
+            latency_grid.add_widget(self.latency_labels[stage])
+        content.add_widget(latency_grid)
+        
+        # Draw the new panels from the latest snapshot
+        self.rendered_version = -1
+        self.timings['panels'] = time.perf_counter() - STARTED
+        self.startup_step()
     
-    @mainthread
     def log(self, message, level="info"):
-        colors = {
-            "error": (1, 0, 0, 1),
-            "success": (0, 1, 0, 1),
-            "warning": (1, 0.6, 0, 1),
-            "market": (0.2, 0.5, 1, 1),
-            "info": (1, 1, 1, 1)
-        }
-        self.log_area.add_log(message, colors.get(level, colors["info"]))
+        # Filtered before any formatting or widget work; callable from any thread
+        severity = LOG_LEVELS.get(level, logging.INFO)
+        if severity < self.log_level:
+            return
+        logger.log(severity, "%s", message)
+        self.log_buffer.add_log(message, LOG_COLORS.get(level, LOG_COLORS["info"]))
     
     def start_bot(self, instance):
         self.token = self.token_input.text.strip()
-        self.stake = float(self.stake_input.text or "1.0")
-        self.max_trades = int(self.max_trades_input.text or "10")
+        paper = self.mode_spinner.text == 'Paper'
         
-        if not self.token:
+        if not self.token and not paper:
             self.log("Please provide an API token", "error")
             return
         
-        self.running = True
+        if self.resume_paper is not None and paper != self.resume_paper:
+            mode = 'Paper' if self.resume_paper else 'Live'
+            self.log(f"The recovered session was {mode}; switch back to {mode} to resume it", "error")
+            return
+        
         self.start_btn.disabled = True
         self.stop_btn.disabled = False
         self.force_btn.disabled = False
         self.switch_btn.disabled = False
-        self.start_time = time.time()
-        
-        # Clear previous data
-        self.last_digits.clear()
-        self.digit_counts.clear()
-        self.color_history.clear()
-        self.pattern_history.clear()
-        self.trade_history.clear()
-        self.pending_contracts.clear()
-        self.trade_count = 0
-        self.profit_loss = 0.0
-        self.wins = 0
-        self.losses = 0
-        self.market_switch_counter = 0
-        
-        # Reset market performance
-        for market in self.available_markets:
-            self.market_performance[market] = {'wins': 0, 'losses': 0, 'profit': 0.0}
-        
-        # Start with a random market
-        self.switch_market()
+        
+        # Commands are applied on the actor thread in submission order
+        self.actor.submit('set_paper', paper)
+        self.actor.submit(
+            'start',
+            float(self.stake_input.text or "1.0"),
+            int(self.max_trades_input.text or "10"),
+            self.resume
+        )
+        self.resume = False
+        self.resume_paper = None
+        
+        if paper:
+            from session import PAPER_BALANCE
+            self.actor.submit('set_balance', PAPER_BALANCE)
+            self.log("Paper trading: orders are simulated against live ticks", "warning")
         
         self.log("Starting Smart Market Differ Bot...")
-        threading.Thread(target=self.run_websocket, daemon=True).start()
+        from tickstore import TickRecorder
+        self.recorder = TickRecorder(os.path.join(self.data_dir, 'ticks'))
+        self.client = self.create_client(paper)
+        self.actor.spawn(self.client.run())
     
     def stop_bot(self, instance):
-        self.running = False
-        if self.ws:
-            self.ws.close()
+        if self.client:
+            self.client.close()
         self.start_btn.disabled = False
         self.stop_btn.disabled = True
         self.force_btn.disabled = True
         self.switch_btn.disabled = True
         self.log("Bot stopped")
+        self.export_latency()
         
-        if self.start_time:
-            session_time = time.time() - self.start_time
-            self.log(f"Session: {session_time:.2f}s, Final P&L: ${self.profit_loss:.2f}")
-    
-    def switch_market(self):
-        new_market = self.choose_best_market()
-        
-        if new_market != self.current_market:
-            self.current_market = new_market
-            self.market_label.text = self.current_market
-            self.market_switch_counter += 1
-            self.switch_label.text = str(self.market_switch_counter)
-            self.log(f"Switching to market: {self.current_market}", "market")
-            
-            if self.ws and self.running:
-                self.ws.send(json.dumps({"forget_all": ["ticks"]}))
-                self.ws.send(json.dumps({"ticks": self.current_market, "subscribe": 1}))
-        
-        return new_market
-    
-    def choose_best_market(self):
-        if all(self.market_performance[m]['wins'] + self.market_performance[m]['losses'] == 0 
-               for m in self.available_markets):
-            return random.choice(self.available_markets)
-        
-        best_market = max(self.available_markets, 
-                         key=lambda m: self.market_performance[m]['profit'])
-        
-        if random.random() < 0.1:
-            other_markets = [m for m in self.available_markets if m != best_market]
-            if other_markets:
-                return random.choice(other_markets)
+        def report(future):
+            # Runs on the actor thread, where reading the engine is safe
+            session_time = future.result()
+            self.journal.flush()
+            if session_time:
+                self.log(f"Session: {session_time:.2f}s, Final P&L: ${self.engine.profit_loss:.2f}")
         
-        return best_market
+        self.actor.submit('stop').add_done_callback(report)
     
     def manual_market_switch(self, instance):
-        if not self.running:
+        if not self.actor.snapshot()['running']:
             return
-        new_market = self.switch_market()
-        self.log(f"Manual switch to: {new_market}", "market")
-    
-    def run_websocket(self):
-        def on_message(ws, message):
-            data = json.loads(message)
-            
-            if "error" in data:
-                self.log(f"Error: {data['error'].get('message')}", "error")
-                return
-            
-            if data.get("msg_type") == "authorize":
-                self.balance = float(data['authorize']['balance'])
-                self.update_ui()
-                self.log("Authorized successfully")
-                self.log(f"Balance: ${self.balance:.2f}")
-                
-                ws.send(json.dumps({"ticks": self.current_market, "subscribe": 1}))
-                self.log(f"Subscribed to {self.current_market}")
-            
-            elif data.get("msg_type") == "tick":
-                digit = int(str(data["tick"]["quote"])[-1])
-                self.process_tick(digit)
-            
-            elif data.get("msg_type") == "buy":
-                self.handle_buy_response(data['buy'])
-        
-        def on_error(ws, error):
-            self.log(f"WebSocket error: {error}", "error")
-        
-        def on_close(ws, *args):
-            self.log("WebSocket closed")
-        
-        def on_open(ws):
-            self.log("Connected to Deriv")
-            ws.send(json.dumps({"authorize": self.token}))
-        
-        self.ws = websocket.WebSocketApp(
-            WS_ENDPOINT,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close
+        self.actor.submit('switch_market').add_done_callback(
+            lambda future: self.log(f"Manual switch to: {future.result()}", "market")
         )
-        
-        self.ws.run_forever()
     
-    def process_tick(self, digit):
-        self.last_digits.append(digit)
-        self.digit_counts[digit] += 1
-        
-        if len(self.last_digits) >= 20:
-            recent_counts = Counter(list(self.last_digits)[-20:])
-            self.rarest_digits = [d for d, count in recent_counts.most_common()[-2:]]
-            self.rarest_label.text = str(self.rarest_digits)
-        
-        color = "green" if digit % 2 == 0 else "red"
-        self.color_history.append(color)
-        self.color_box.update_colors(list(self.color_history))
-        
-        self.detect_patterns()
-        
-        if self.should_trade(digit):
-            self.execute_trade(digit)
-    
-    def detect_patterns(self):
-        if len(self.color_history) < 5:
-            self.pattern_label.text = "None"
-            return
-        
-        recent = list(self.color_history)[-5:]
-        
-        if all(recent[i] != recent[i+1] for i in range(len(recent)-1)):
-            self.pattern_label.text = "Alternating"
-            self.pattern_history.append("alternating")
-        elif all(c == "red" for c in recent):
-            self.pattern_label.text = "Red Streak"
-            self.pattern_history.append("red_streak")
-        elif all(c == "green" for c in recent):
-            self.pattern_label.text = "Green Streak"
-            self.pattern_history.append("green_streak")
-        else:
-            self.pattern_label.text = "Mixed"
-            self.pattern_history.append("mixed")
+    def force_trade(self, instance):
+        self.actor.submit('force_trade')
     
-    def should_trade(self, digit):
-        if self.trade_count >= self.max_trades:
-            return False
-        
-        if len(self.last_digits) < 20 or digit not in self.rarest_digits:
-            return False
-        
-        if len(self.pattern_history) < 3:
-            return False
-        
-        recent_patterns = list(self.pattern_history)[-3:]
-        return recent_patterns[-1] in ["alternating", "red_streak", "green_streak"]
+    def attach_session(self, session, pipeline):
+        # Actor thread: engine listeners are only changed where it emits.
+        # Contracts restored from the journal, like those open across a
+        # reconnect, are streamed again on every authorize
+        if self.session is not None:
+            self.session.close()
+        self.session = session
+        session.add(self.engine, pipeline)
     
-    def execute_trade(self, barrier):
-        if not self.running or not self.ws:
-            return
-        
-        if self.balance < self.stake:
-            self.log("Insufficient balance", "error")
-            return
-        
-        contract = {
-            "buy": 1,
-            "price": self.stake,
-            "parameters": {
-                "amount": self.stake,
-                "basis": "stake",
-                "contract_type": "DIGITDIFF",
-                "currency": "USD",
-                "duration": 5,
-                "duration_unit": "t",
-                "symbol": self.current_market,
-                "barrier": str(barrier)
-            }
-        }
-        
-        self.ws.send(json.dumps(contract))
-        self.trade_count += 1
-        self.log(f"Trade {self.trade_count}/{self.max_trades} barrier {barrier} ({self.current_market})")
-        self.update_ui()
-        
-        if self.trade_count % self.market_switch_interval == 0:
-            self.switch_market()
+    def create_client(self, paper):
+        # websockets is only needed once the first session starts
+        from derivclient import WS_ENDPOINT, DerivClient
+        from orders import OrderPipeline
+        from session import AccountSession
+        engine = self.engine
+        recorder = self.recorder
+        client = DerivClient(self.endpoint or WS_ENDPOINT, token="" if paper else self.token)
+        client.probes = self.probes
+        
+        # Live orders buy from proposal streams kept open on each market's
+        # rarest digits
+        pipeline = None
+        if not paper:
+            pipeline = OrderPipeline(client, float(self.stake_input.text or "1.0"))
+        self.pipeline = pipeline
+        # Created before the listeners below so they see its updates; the
+        # engine is attached on the actor thread before run starts
+        session = AccountSession(client)
+        self.actor.loop.call_soon_threadsafe(self.attach_session, session, pipeline)
+        
+        # Every market streams at once so switching never drops ticks; the
+        # subscriptions are sent as soon as the session is ready
+        client.subscribe_ticks(engine.available_markets)
+        
+        def on_open():
+            self.log("Connected to Deriv")
+            if paper:
+                self.log(f"Subscribed to {', '.join(engine.available_markets)}")
+        
+        def on_authorize(account):
+            self.log("Authorized successfully")
+            self.log(f"Balance: ${engine.balance:.2f}")
+            self.log(f"Subscribed to {', '.join(engine.available_markets)}")
+        
+        def on_tick(symbol, tick):
+            digit = tick["digit"]
+            recorder.record(symbol, tick["epoch"], tick["quote"], digit, tick["pip_size"] or 0)
+            engine.on_tick(digit, symbol)
+            if pipeline is not None:
+                pipeline.watch(symbol, engine.markets[symbol].rarest_digits)
+        
+        def on_error(error):
+            self.log(f"Error: {error.get('message')}", "error")
+        
+        def on_close():
+            if client.running:
+                self.log("WebSocket closed, reconnecting...", "warning")
+            else:
+                # Final close runs on the socket thread, after the last tick
+                recorder.close()
+                self.log("WebSocket closed")
+        
+        def on_recovered(downtime):
+            self.log(f"Reconnected after {downtime:.1f}s", "success")
+        
+        client.on("open", on_open)
+        client.on("authorize", on_authorize)
+        client.on("tick", on_tick)
+        client.on("error", on_error)
+        client.on("close", on_close)
+        client.on("recovered", on_recovered)
+        return client
     
-    def handle_buy_response(self, buy_data):
-        if "error" in buy_data:
-            self.log(f"Trade error: {buy_data['error']['message']}", "error")
-            self.trade_count -= 1
-            return
-        
-        contract_id = buy_data.get('contract_id')
-        self.log(f"Trade placed (Contract: {contract_id})", "success")
-        
-        self.pending_contracts[contract_id] = {
-            'market': self.current_market,
-            'barrier': buy_data.get('parameters', {}).get('barrier', 'unknown'),
-            'stake': self.stake,
-            'time': time.time()
-        }
-        
-        threading.Timer(5, self.check_contract_status, args=[contract_id]).start()
+    def refresh_latency(self, dt):
+        for stage, label in self.latency_labels.items():
+            summary = self.probes.stage_summary(stage)
+            if summary['count']:
+                label.text = f"{summary['p50_ns'] / 1e6:.3f} / {summary['p99_ns'] / 1e6:.3f}"
     
-    def check_contract_status(self, contract_id):
-        if not self.running or contract_id not in self.pending_contracts:
+    def export_latency(self, dt=None):
+        if self.probes is None:
             return
-        
-        contract_info = self.pending_contracts[contract_id]
-        market = contract_info['market']
-        
-        market_win_rates = {
-            "R_10": 0.65, "R_25": 0.70, "R_50": 0.75,
-            "R_75": 0.70, "R_100": 0.65
-        }
-        
-        is_win = random.random() < market_win_rates.get(market, 0.7)
-        
-        if is_win:
-            profit = self.stake * 0.95
-            self.log(f"Contract {contract_id} WON! +${profit:.2f}", "success")
-            self.wins += 1
-            self.market_performance[market]['wins'] += 1
-        else:
-            profit = -self.stake
-            self.log(f"Contract {contract_id} LOST -${self.stake:.2f}", "error")
-            self.losses += 1
-            self.market_performance[market]['losses'] += 1
-        
-        self.profit_loss += profit
-        self.balance += profit
-        self.market_performance[market]['profit'] += profit
-        
-        total_trades = self.wins + self.losses
-        self.win_rate = (self.wins / total_trades * 100) if total_trades > 0 else 0
-        
-        if contract_id in self.pending_contracts:
-            del self.pending_contracts[contract_id]
-        
-        self.update_ui()
+        self.probes.write_snapshot(os.path.join(self.data_dir, 'metrics'))
     
-    def force_trade(self, instance):
-        if not self.rarest_digits:
-            self.log("No rarest digits yet", "warning")
+    def refresh_ui(self, dt):
+        # Runs on the main thread at ui_refresh_interval; skips idle frames
+        if self.log_area is not None:
+            self.log_area.flush()
+        if self.actor is None:
             return
-        
-        if self.trade_count >= self.max_trades:
-            self.log("Max trades reached", "warning")
+        snapshot = self.actor.snapshot()
+        if snapshot['version'] == self.rendered_version:
             return
-        
-        barrier = self.rarest_digits[0]
-        self.execute_trade(barrier)
+        self.rendered_version = snapshot['version']
+        self.render(snapshot)
     
-    @mainthread
-    def update_ui(self):
-        self.balance_label.text = f"${self.balance:.2f}"
-        self.pl_label.text = f"${self.profit_loss:+.2f}"
-        self.trades_label.text = f"{self.trade_count}/{self.max_trades}"
-        self.winrate_label.text = f"{self.win_rate:.1f}%"
-        self.winloss_label.text = f"{self.wins}/{self.losses}"
-        
-        if self.profit_loss >= 0:
+    def render(self, snapshot):
+        self.market_label.text = snapshot['current_market']
+        self.switch_label.text = str(snapshot['switches'])
+        self.balance_label.text = f"${snapshot['balance']:.2f}"
+        self.pl_label.text = f"${snapshot['profit_loss']:+.2f}"
+        self.trades_label.text = f"{snapshot['trade_count']}/{snapshot['max_trades']}"
+        self.winrate_label.text = f"{snapshot['win_rate']:.1f}%"
+        self.winloss_label.text = f"{snapshot['wins']}/{snapshot['losses']}"
+        self.rarest_label.text = str(snapshot['rarest_digits'])
+        pattern = snapshot['pattern']
+        if pattern is None:
+            self.pattern_label.text = "None"
+        else:
+            self.pattern_label.text = PATTERN_LABELS.get(pattern, pattern.replace('_', ' ').title())
+        
+        if snapshot['profit_loss'] >= 0:
             self.pl_label.color = (0, 1, 0, 1)
         else:
             self.pl_label.color = (1, 0, 0, 1)
         
-        self.perf_bar.update_performance(self.market_performance, self.available_markets)
+        if self.color_box is None:
+            return
+        self.color_box.update_colors(snapshot['colors'])
+        self.perf_bar.update_performance(snapshot['market_performance'], list(snapshot['market_performance']))
 
 class SmartMarketDifferBotApp(App):
     def build(self):
-        return SmartMarketDifferBot()
+        setup_file_logging(self.user_data_dir)
+        return SmartMarketDifferBot(data_dir=self.user_data_dir)
+    
+    def on_pause(self):
+        # Android may kill a paused app without calling on_stop
+        if self.root.actor is not None:
+            self.root.actor.loop.call_soon_threadsafe(self.root.journal.flush)
+        return True
 
 if __name__ == '__main__':
     SmartMarketDifferBotApp().run()
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Rolling last-digit statistics over one tick stream.
+
+All windows share a single ring buffer sized to the largest window, and
+each window keeps its own 10-slot count array, so a tick costs one store
+plus one increment and at most one decrement per window.
+"""
+
+DEFAULT_WINDOWS = (20, 100, 1000)
+
+
+class DigitStats:
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        if not windows:
+            raise ValueError("at least one window size is required")
+        if min(windows) < 1:
+            raise ValueError("window sizes must be positive")
+
+        self.windows = tuple(sorted(set(windows)))
+        self.capacity = self.windows[-1]
+        self.buffer = bytearray(self.capacity)
+        self.counts = {size: [0] * 10 for size in self.windows}
+        self.pos = 0
+        self.total = 0
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def push(self, digit):
+        buffer = self.buffer
+        capacity = self.capacity
+        pos = self.pos
+        total = self.total
+
+        # Evict the digit falling out of each window before overwriting
+        for size, counts in self.counts.items():
+            if total >= size:
+                counts[buffer[(pos - size) % capacity]] -= 1
+            counts[digit] += 1
+
+        buffer[pos] = digit
+        self.pos = pos + 1 if pos + 1 < capacity else 0
+        self.total = total + 1
+
+    def filled(self, size):
+        return min(self.total, size)
+
+    def window_counts(self, size):
+        return list(self.counts[size])
+
+    def rarest(self, size, k=2):
+        # Rarest digits seen in the window, rarest first; ties go to the
+        # lower digit. A k-pass selection over 10 slots, no sorting.
+        counts = self.counts[size]
+        picked = []
+        for _ in range(k):
+            best = -1
+            best_count = 0
+            for digit in range(10):
+                count = counts[digit]
+                if count and (best < 0 or count < best_count) and digit not in picked:
+                    best = digit
+                    best_count = count
+            if best < 0:
+                break
+            picked.append(best)
+        return picked
+
+    def recent(self, n=None):
+        # Oldest-to-newest copy of the last n digits (for display/debugging)
+        n = len(self) if n is None else min(n, len(self))
+        start = (self.pos - n) % self.capacity
+        if start + n <= self.capacity:
+            return list(self.buffer[start:start + n])
+        return list(self.buffer[start:]) + list(self.buffer[:self.pos])
+
+    def clear(self):
+        self.buffer = bytearray(self.capacity)
+        for counts in self.counts.values():
+            counts[:] = [0] * 10
+        self.pos = 0
+        self.total = 0
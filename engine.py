@@ -0,0 +1,653 @@
+"""Headless Smart Market Differ strategy engine.
+
+Holds market state, digit/pattern analysis, trade decisions and accounting
+with no UI or network imports. Hosts drive it with ``on_tick``/``on_buy``/
+``settle`` and listen for events:
+
+    log(message, level)         human readable activity
+    order(contract, order)      a ``buy`` request the host should send; pass
+                                its reply back as ``on_buy(reply, order)``.
+                                A "Disconnected" error leaves the order in
+                                ``unknown`` until the host passes the
+                                account's contracts to ``reconcile``
+    market(old, new)            active market changed
+    contract(contract_id, info) a buy was acknowledged and is now open; live
+                                hosts stream its updates into
+                                ``on_contract_update``
+    settle(contract_id, profit, info) a contract closed with ``profit``
+    reject(order, reason)       an order was refused before being sent
+    start(resume)               a session started, or resumed from restored
+                                state
+    stop()                      the session was stopped
+
+With ``parallel=True`` every analysed market is traded on its own signals
+instead of rotating one active market through ``switch_market``. Which
+market is active is up to the ``allocation`` policy (see ``allocation``).
+
+With ``paper=True`` no orders are emitted: contracts are opened locally and
+settled from the market's own tick stream on the CONTRACT_TICKS-th tick.
+
+Analysis state is kept per market (``MarketState``) so ticks for every
+symbol can be fed in at once and switching markets starts from warm data.
+Tick patterns come from a compiled ``patterns.PatternSet``; by default the
+alternation and colour streaks of ``pattern_length`` ticks. Every order
+passes the ``risk.RiskEngine`` checks before it is placed.
+
+Every state change bumps ``version`` so a UI can poll ``snapshot()`` at its
+own rate instead of redrawing per tick. ``export_state``/``restore_state``
+carry the session accounting (not the tick analysis) across restarts; see
+``journal``.
+"""
+
+import itertools
+import time
+from collections import defaultdict, deque
+
+from allocation import Allocator, make_allocator
+from digitstats import DigitStats
+from patterns import default_patterns
+from risk import RiskEngine
+
+DEFAULT_MARKETS = ("R_10", "R_25", "R_50", "R_75", "R_100")
+
+TRADE_PATTERNS = ("alternating", "red_streak", "green_streak")
+
+CONTRACT_TICKS = 5
+
+# Classified ticks remembered for pattern_confirm
+PATTERN_HISTORY = 10
+
+# Paper-trading profit on a winning DIGITDIFF contract, as a share of stake
+PAPER_PROFIT_RATIO = 0.95
+
+# Settled contracts kept in trade_history
+TRADE_HISTORY = 500
+
+
+def contract_matches(entry, order):
+    # A portfolio entry names its symbol; a profit_table one only has the
+    # shortcode, "DIGITDIFF_<symbol>_<payout>_..."
+    if 'symbol' in entry:
+        same_market = (entry.get('contract_type') == "DIGITDIFF"
+                       and entry['symbol'] == order['market'])
+    else:
+        same_market = str(entry.get('shortcode', "")).startswith(f"DIGITDIFF_{order['market']}_")
+    return same_market and round(float(entry.get('buy_price', 0)), 2) == round(order['stake'], 2)
+
+
+class MarketState:
+    def __init__(self, symbol, rarity_window=20, rarest_count=2):
+        self.symbol = symbol
+        self.rarity_window = rarity_window
+        self.rarest_count = rarest_count
+        self.digit_stats = DigitStats(windows=(rarity_window, 100, 1000))
+        self.rarest_cache = []
+        self.rarest_total = 0
+        # Packed per-tick codes, newest lowest (see patterns.PatternMatcher)
+        self.history = 0
+        self.seen = 0
+        self.pattern = None
+        self.pattern_count = 0
+        self.paper_contracts = []
+
+    @property
+    def rarest_digits(self):
+        # Recomputed at most once per tick, and only when someone asks
+        stats = self.digit_stats
+        if stats.total != self.rarest_total:
+            self.rarest_total = stats.total
+            if stats.filled(self.rarity_window) >= self.rarity_window:
+                self.rarest_cache = stats.rarest(self.rarity_window, self.rarest_count)
+        return self.rarest_cache
+
+    def clear(self):
+        self.digit_stats.clear()
+        self.rarest_cache = []
+        self.rarest_total = 0
+        self.history = 0
+        self.seen = 0
+        self.pattern = None
+        self.pattern_count = 0
+        self.paper_contracts = []
+
+
+class DifferEngine:
+    def __init__(self, markets=DEFAULT_MARKETS, stake=1.0, max_trades=10,
+                 rarity_window=20, rarest_count=2, pattern_length=5,
+                 pattern_confirm=3, market_switch_interval=5, exploration=0.1,
+                 paper=False, parallel=False, allocation="greedy", patterns=None,
+                 trade_patterns=TRADE_PATTERNS, risk=None):
+        self.listeners = defaultdict(list)
+        self.paper = paper
+        self.parallel = parallel
+        self.paper_ids = itertools.count(1)
+        self.order_ids = itertools.count(1)
+
+        # Trading variables
+        self.available_markets = list(markets)
+        self.current_market = self.available_markets[0]
+        self.stake = stake
+        self.max_trades = max_trades
+        self.trade_count = 0
+        self.balance = 0.0
+        self.reserved = 0.0
+        self.profit_loss = 0.0
+        self.win_rate = 0.0
+        self.wins = 0
+        self.losses = 0
+
+        # Market performance tracking
+        self.market_performance = {market: {'wins': 0, 'losses': 0, 'profit': 0.0}
+                                   for market in self.available_markets}
+        self.market_switch_counter = 0
+        self.market_switch_interval = market_switch_interval
+        self.exploration = exploration
+        if not isinstance(allocation, Allocator):
+            allocation = make_allocator(allocation, self.available_markets, exploration)
+        self.allocator = allocation
+        self.risk = risk or RiskEngine()
+
+        # Market analysis
+        self.rarity_window = rarity_window
+        self.rarest_count = rarest_count
+        self.patterns = patterns or default_patterns(pattern_length)
+        self.matcher = self.patterns.compile()
+        self.trade_patterns = frozenset(self.patterns.id(name) for name in trade_patterns)
+        self.pattern_length = self.matcher.length
+        self.pattern_confirm = pattern_confirm
+        self.markets = {market: MarketState(market, rarity_window, rarest_count)
+                        for market in self.available_markets}
+
+        # Trade tracking
+        self.trade_history = deque(maxlen=TRADE_HISTORY)
+        self.pending_contracts = {}
+        # Orders sent but not yet acknowledged, by order id, and orders whose
+        # reply was lost with the connection (see ``reconcile``)
+        self.in_flight = {}
+        self.unknown = {}
+        self.start_time = None
+        # Mode of the session put back by ``restore_state``, if any
+        self.restored_paper = None
+        self.running = False
+        self.connected = False
+
+        self.version = 0
+
+    # Events
+
+    def subscribe(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        if callback in self.listeners[event]:
+            self.listeners[event].remove(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
+
+    @property
+    def state(self):
+        return self.markets[self.current_market]
+
+    @property
+    def rarest_digits(self):
+        return self.state.rarest_digits
+
+    def log(self, message, level="info"):
+        self.emit("log", message, level)
+
+    def touch(self):
+        self.version += 1
+
+    # Session lifecycle
+
+    def start(self, stake=None, max_trades=None, resume=False):
+        # ``resume`` keeps the accounting put back by ``restore_state``, and
+        # only in the mode it was recorded in: live contracts are never
+        # tracked by a paper session
+        if resume and self.restored_paper is not None and self.restored_paper != self.paper:
+            mode = "paper" if self.restored_paper else "live"
+            raise ValueError(f"the recovered session was {mode}; resume it in {mode} mode")
+        if stake is not None:
+            self.stake = stake
+        if max_trades is not None:
+            self.max_trades = max_trades
+
+        self.running = True
+        if resume:
+            self.start_time = self.start_time or time.time()
+            self.touch()
+            self.log(f"Resuming session: {self.trade_count} trades, "
+                     f"{len(self.pending_contracts)} open, P&L ${self.profit_loss:.2f}")
+            self.emit("start", True)
+            return
+        self.start_time = time.time()
+        self.restored_paper = None
+
+        # Clear previous data
+        for state in self.markets.values():
+            state.clear()
+        self.trade_history.clear()
+        self.pending_contracts.clear()
+        self.in_flight.clear()
+        self.unknown.clear()
+        self.reserved = 0.0
+        self.risk.clear_open()
+        self.trade_count = 0
+        self.profit_loss = 0.0
+        self.win_rate = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.market_switch_counter = 0
+
+        # Reset market performance
+        for market in self.available_markets:
+            self.market_performance[market] = {'wins': 0, 'losses': 0, 'profit': 0.0}
+        self.allocator.reset()
+
+        # Recorded before the first switch so a replay starts from scratch
+        self.emit("start", False)
+
+        # Start with a random market
+        self.switch_market()
+        self.touch()
+
+    def stop(self):
+        self.running = False
+        self.touch()
+        self.emit("stop")
+        if self.start_time:
+            return time.time() - self.start_time
+        return 0.0
+
+    def set_connected(self, connected):
+        self.connected = connected
+        self.touch()
+
+    def set_paper(self, paper):
+        self.paper = paper
+        self.touch()
+
+    def set_balance(self, balance):
+        self.balance = float(balance)
+        self.touch()
+
+    def set_account_balance(self, balance):
+        # The broker's balance already has the stakes of open contracts
+        # taken out, while here they are still part of ``balance`` and held
+        # in ``reserved``
+        self.set_balance(float(balance) + sum(info['stake'] for info in self.pending_contracts.values()))
+
+    # Market selection
+
+    def switch_market(self, market=None):
+        new_market = market or self.choose_best_market()
+
+        if new_market != self.current_market:
+            old_market = self.current_market
+            self.current_market = new_market
+            self.market_switch_counter += 1
+            self.touch()
+            self.log(f"Switching to market: {self.current_market}", "market")
+            self.emit("market", old_market, new_market)
+
+        return new_market
+
+    def choose_best_market(self):
+        return self.allocator.select(self)
+
+    def allocate(self, symbol):
+        # Per-signal policies re-pick the market for every signal; it is only
+        # traded, and only then made active, if the policy lands on the
+        # market the signal came from
+        if self.allocator.per_signal:
+            if self.choose_best_market() != symbol:
+                return False
+            self.switch_market(symbol)
+        return symbol == self.current_market
+
+    # Analysis
+
+    def on_tick(self, digit, symbol=None):
+        state = self.markets.get(symbol or self.current_market)
+        if state is None:
+            return
+        if state.paper_contracts:
+            self.settle_paper(state, digit)
+        state.digit_stats.push(digit)
+        matcher = self.matcher
+        state.history = ((state.history << matcher.bits) | matcher.codes[digit]) & matcher.history_mask
+        state.seen += 1
+        self.detect_patterns(state)
+        self.touch()
+
+        # Every market is analysed; only the active one is traded unless
+        # running in parallel mode
+        if not (self.parallel or self.allocator.per_signal
+                or state.symbol == self.current_market):
+            return
+        if self.should_trade(state, digit) and (self.parallel or self.allocate(state.symbol)):
+            self.execute_trade(digit, state.symbol)
+
+    def detect_patterns(self, state):
+        if state.seen < self.pattern_length:
+            state.pattern = None
+            return
+
+        state.pattern = self.matcher.classify(state.history)
+        if state.pattern_count < PATTERN_HISTORY:
+            state.pattern_count += 1
+
+    def should_trade(self, state, digit):
+        if self.trade_count >= self.max_trades:
+            return False
+
+        # Cheapest checks first; rarest digits are only computed if needed
+        if state.pattern_count < self.pattern_confirm:
+            return False
+
+        if state.pattern not in self.trade_patterns:
+            return False
+
+        return (state.digit_stats.filled(self.rarity_window) >= self.rarity_window
+                and digit in state.rarest_digits)
+
+    # Orders and accounting
+
+    def execute_trade(self, barrier, market=None):
+        if not self.running or not self.connected:
+            return
+        market = market or self.current_market
+
+        # Stakes of in-flight and open contracts are already committed
+        if self.balance - self.reserved < self.stake:
+            self.reject(market, "balance")
+            self.log("Insufficient balance", "error")
+            return
+
+        reason = self.risk.check(market, self.stake)
+        if reason is not None:
+            self.reject(market, reason)
+            self.log(f"Trade on {market} blocked by risk limit: {reason}", "warning")
+            return
+
+        contract = {
+            "buy": 1,
+            "price": self.stake,
+            "parameters": {
+                "amount": self.stake,
+                "basis": "stake",
+                "contract_type": "DIGITDIFF",
+                "currency": "USD",
+                "duration": CONTRACT_TICKS,
+                "duration_unit": "t",
+                "symbol": market,
+                "barrier": str(barrier)
+            }
+        }
+
+        order = {
+            'id': next(self.order_ids),
+            'market': market,
+            'barrier': str(barrier),
+            'stake': self.stake
+        }
+        self.trade_count += 1
+        self.reserved += self.stake
+        self.in_flight[order['id']] = order
+        self.risk.opened(market, self.stake)
+        self.touch()
+        self.log(f"Trade {self.trade_count}/{self.max_trades} barrier {barrier} ({market})")
+        if self.paper:
+            self.on_buy({"buy": {"contract_id": f"paper-{next(self.paper_ids)}"}}, order)
+        else:
+            self.emit("order", contract, order)
+
+        if (not self.parallel and not self.allocator.per_signal
+                and self.trade_count % self.market_switch_interval == 0):
+            self.switch_market()
+
+    def reject(self, market, reason):
+        order = {'market': market, 'stake': self.stake}
+        self.risk.reject(market, self.stake, reason)
+        self.touch()
+        self.emit("reject", order, reason)
+
+    def force_trade(self):
+        if not self.rarest_digits:
+            self.log("No rarest digits yet", "warning")
+            return
+
+        if self.trade_count >= self.max_trades:
+            self.log("Max trades reached", "warning")
+            return
+
+        self.execute_trade(self.rarest_digits[0])
+
+    def on_buy(self, reply, order):
+        # ``order`` is what was actually sent, so a reply that arrives after a
+        # market switch is still booked against the market it was placed on
+        self.in_flight.pop(order.get('id'), None)
+        if reply.get("error", {}).get("code") == "Disconnected":
+            # The broker may have filled it: its stake stays committed until
+            # ``reconcile`` finds the contract or shows there is none
+            self.unknown[order['id']] = dict(order, time=time.time())
+            self.log(f"Order on {order['market']} lost its reply, reconciling after reconnect",
+                     "warning")
+            self.touch()
+            return
+        if "error" in reply:
+            self.log(f"Trade error: {reply['error']['message']}", "error")
+            self.trade_count -= 1
+            self.reserved -= order['stake']
+            self.risk.cancelled(order['market'], order['stake'])
+            self.touch()
+            return
+
+        contract_id = reply['buy'].get('contract_id')
+        self.log(f"Trade placed (Contract: {contract_id})", "success")
+
+        info = {
+            'market': order['market'],
+            'barrier': order['barrier'],
+            'stake': order['stake'],
+            'time': time.time()
+        }
+        if self.paper:
+            info['ticks_left'] = CONTRACT_TICKS
+            self.markets[order['market']].paper_contracts.append(contract_id)
+        self.pending_contracts[contract_id] = info
+        self.touch()
+        self.emit("contract", contract_id, info)
+
+    def unknown_since(self):
+        # Earliest send time of an unresolved order, for profit_table
+        return min((order['time'] for order in self.unknown.values()), default=None)
+
+    def reconcile(self, open_contracts, sold_contracts=(), known=None):
+        # ``open_contracts`` are portfolio entries, ``sold_contracts``
+        # profit_table entries since ``unknown_since``. Contracts no engine
+        # knows are adopted by a lost order on the same market and stake;
+        # hosts then stream them, which settles any already sold. Lost
+        # orders left unmatched were never filled. Engines sharing an
+        # account pass one ``known`` set of contract ids, which this adds
+        # its own and adopted ids to, so no contract is adopted twice.
+        if known is None:
+            known = set()
+        known.update(self.pending_contracts)
+        known.update(trade['contract_id'] for trade in self.trade_history)
+        for entry in itertools.chain(open_contracts, sold_contracts):
+            if not self.unknown:
+                break
+            contract_id = entry.get('contract_id')
+            if contract_id in known:
+                continue
+            for order_id, order in self.unknown.items():
+                if contract_matches(entry, order):
+                    del self.unknown[order_id]
+                    known.add(contract_id)
+                    self.log(f"Adopted contract {contract_id} from a lost order", "warning")
+                    self.on_buy({"buy": {"contract_id": contract_id}}, order)
+                    # Reconciling follows an authorize, whose balance was
+                    # already short this stake
+                    self.balance += order['stake']
+                    break
+
+        for order in self.unknown.values():
+            self.log(f"Lost order on {order['market']} was not filled", "warning")
+            self.trade_count -= 1
+            self.reserved -= order['stake']
+            self.risk.cancelled(order['market'], order['stake'])
+        self.unknown.clear()
+        self.touch()
+
+    def on_contract_update(self, contract):
+        # proposal_open_contract payload; settles once the broker has sold it
+        contract_id = contract.get('contract_id')
+        if contract_id not in self.pending_contracts or not contract.get('is_sold'):
+            return
+        self.settle(contract_id, float(contract.get('profit', 0.0)))
+
+    def settle_paper(self, state, digit):
+        # A DIGITDIFF contract wins when its last tick's digit differs
+        # from the barrier
+        still_open = []
+        for contract_id in state.paper_contracts:
+            info = self.pending_contracts.get(contract_id)
+            if info is None:
+                continue
+            info['ticks_left'] -= 1
+            if info['ticks_left'] > 0:
+                still_open.append(contract_id)
+            elif str(digit) != info['barrier']:
+                self.settle(contract_id, info['stake'] * PAPER_PROFIT_RATIO)
+            else:
+                self.settle(contract_id, -info['stake'])
+        state.paper_contracts = still_open
+
+    def settle(self, contract_id, profit):
+        contract_info = self.pending_contracts.pop(contract_id, None)
+        if contract_info is None:
+            return
+
+        market = contract_info['market']
+        if profit > 0:
+            self.log(f"Contract {contract_id} WON! +${profit:.2f}", "success")
+            self.wins += 1
+            self.market_performance[market]['wins'] += 1
+        else:
+            self.log(f"Contract {contract_id} LOST -${-profit:.2f}", "error")
+            self.losses += 1
+            self.market_performance[market]['losses'] += 1
+
+        self.profit_loss += profit
+        self.balance += profit
+        self.reserved -= contract_info['stake']
+        self.market_performance[market]['profit'] += profit
+        self.allocator.update(market, profit)
+        self.risk.closed(market, contract_info['stake'], profit)
+
+        self.trade_history.append({
+            'contract_id': contract_id,
+            'market': market,
+            'barrier': contract_info['barrier'],
+            'stake': contract_info['stake'],
+            'profit': profit,
+            'time': time.time()
+        })
+
+        total_trades = self.wins + self.losses
+        self.win_rate = (self.wins / total_trades * 100) if total_trades > 0 else 0
+        self.touch()
+        self.emit("settle", contract_id, profit, contract_info)
+
+    # Persistence
+
+    def export_state(self):
+        # Plain, JSON-safe session accounting. Orders still in flight are left
+        # out: only acknowledged contracts can be tracked after a restart.
+        # Contract ids stay values (not keys) so they keep their type.
+        return {
+            'current_market': self.current_market,
+            'closed': not self.running,
+            'paper': self.paper,
+            'trade_count': self.trade_count - len(self.in_flight) - len(self.unknown),
+            'profit_loss': self.profit_loss,
+            'wins': self.wins,
+            'losses': self.losses,
+            'switches': self.market_switch_counter,
+            'start_time': self.start_time,
+            'market_performance': {m: dict(p) for m, p in self.market_performance.items()},
+            'pending': [[contract_id, dict(info)]
+                        for contract_id, info in self.pending_contracts.items()],
+            'history': [dict(trade) for trade in self.trade_history],
+            'risk': self.risk.export_state()
+        }
+
+    def restore_state(self, state):
+        if state['current_market'] in self.markets:
+            self.current_market = state['current_market']
+        self.trade_count = state['trade_count']
+        self.profit_loss = state['profit_loss']
+        self.wins = state['wins']
+        self.losses = state['losses']
+        self.market_switch_counter = state['switches']
+        self.start_time = state['start_time']
+        self.restored_paper = state.get('paper')
+        total_trades = self.wins + self.losses
+        self.win_rate = (self.wins / total_trades * 100) if total_trades > 0 else 0
+
+        for market in self.available_markets:
+            self.market_performance[market] = dict(
+                state['market_performance'].get(market) or {'wins': 0, 'losses': 0, 'profit': 0.0})
+        self.trade_history.clear()
+        self.trade_history.extend(dict(trade) for trade in state['history'])
+        self.allocator.restore(self.market_performance, self.trade_history)
+        if state.get('risk'):
+            self.risk.restore_state(state['risk'])
+
+        # Open contracts hold stake and risk exactly as when they were placed
+        self.pending_contracts.clear()
+        self.in_flight.clear()
+        self.unknown.clear()
+        self.reserved = 0.0
+        self.risk.clear_open()
+        for market_state in self.markets.values():
+            market_state.paper_contracts = []
+        last_paper_id = 0
+        for contract_id, info in state['pending']:
+            self.pending_contracts[contract_id] = info
+            self.reserved += info['stake']
+            self.risk.opened(info['market'], info['stake'])
+            if 'ticks_left' in info and info['market'] in self.markets:
+                self.markets[info['market']].paper_contracts.append(contract_id)
+                last_paper_id = max(last_paper_id, int(str(contract_id).rpartition('-')[2]))
+        self.paper_ids = itertools.count(last_paper_id + 1)
+        self.touch()
+
+    # Readers
+
+    def snapshot(self):
+        state = self.state
+        return {
+            'version': self.version,
+            'running': self.running,
+            'current_market': self.current_market,
+            'balance': self.balance,
+            'reserved': self.reserved,
+            'profit_loss': self.profit_loss,
+            'trade_count': self.trade_count,
+            'max_trades': self.max_trades,
+            'win_rate': self.win_rate,
+            'wins': self.wins,
+            'losses': self.losses,
+            'switches': self.market_switch_counter,
+            'rarest_digits': list(state.rarest_digits),
+            'pattern': self.matcher.names[state.pattern] if state.pattern is not None else None,
+            'colors': self.matcher.colors(state.history, state.seen),
+            'market_performance': {m: dict(p) for m, p in self.market_performance.items()},
+            'pending': len(self.pending_contracts),
+            'risk': self.risk.summary(),
+            'paper': self.paper
+        }
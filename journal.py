@@ -0,0 +1,307 @@
+"""Append-only session journal for ``DifferEngine``.
+
+``attach`` records the engine's accounting events as JSON lines in
+``<directory>/journal.log``, each with a sequence number and wall time:
+
+    start    a fresh session began, in paper or live mode; everything
+             before it is history
+    stop     the session was stopped; it is not resumed on recovery
+    order    a buy request went out (audit only, it may never be filled)
+    open     the broker acknowledged a contract
+    settle   a contract closed with ``profit``, with the risk engine's day
+             figures after it
+    market   the active market changed
+
+Records are buffered and written in batches of ``batch_size``, or every
+``flush_interval`` seconds by ``flush_loop``, with an fsync per batch, so a
+crash loses at most one batch. Every ``snapshot_interval`` records (and at
+every fresh start) the whole session state from ``engine.export_state`` is
+written atomically to ``snapshot.json`` and the log is truncated, so
+``recover`` replays one snapshot plus at most ``snapshot_interval`` records
+however long the session has run. Records at or below the snapshot's
+sequence number are skipped, which covers a crash between the two writes,
+and a torn last line is dropped.
+
+All writes happen on the thread that emits the engine's events; ``recover``
+runs before that thread starts.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+from engine import TRADE_HISTORY
+
+JOURNAL_FILE = 'journal.log'
+SNAPSHOT_FILE = 'snapshot.json'
+
+
+def empty_performance():
+    return {'wins': 0, 'losses': 0, 'profit': 0.0}
+
+
+class SessionReplay:
+    # Applies journal records to the plain state of ``engine.export_state``
+    def __init__(self, state):
+        self.closed = state.get('closed', False)
+        self.paper = state.get('paper')
+        self.current_market = state['current_market']
+        self.trade_count = state['trade_count']
+        self.profit_loss = state['profit_loss']
+        self.wins = state['wins']
+        self.losses = state['losses']
+        self.switches = state['switches']
+        self.start_time = state['start_time']
+        self.market_performance = {m: dict(p) for m, p in state['market_performance'].items()}
+        self.pending = {contract_id: info for contract_id, info in state['pending']}
+        self.history = deque(state['history'], maxlen=TRADE_HISTORY)
+        self.risk = state.get('risk')
+
+    def apply(self, record):
+        kind = record['type']
+        if kind == 'start':
+            self.closed = False
+            self.paper = record.get('paper')
+            self.trade_count = 0
+            self.profit_loss = 0.0
+            self.wins = 0
+            self.losses = 0
+            self.switches = 0
+            self.start_time = record['t']
+            for market in self.market_performance:
+                self.market_performance[market] = empty_performance()
+            self.pending.clear()
+            self.history.clear()
+        elif kind == 'open':
+            self.pending[record['contract_id']] = record['info']
+            self.trade_count += 1
+        elif kind == 'settle':
+            info = self.pending.pop(record['contract_id'], None)
+            if info is None:
+                return
+            profit = record['profit']
+            self.risk = record.get('risk', self.risk)
+            performance = self.market_performance.setdefault(info['market'], empty_performance())
+            if profit > 0:
+                self.wins += 1
+                performance['wins'] += 1
+            else:
+                self.losses += 1
+                performance['losses'] += 1
+            self.profit_loss += profit
+            performance['profit'] += profit
+            self.history.append({
+                'contract_id': record['contract_id'],
+                'market': info['market'],
+                'barrier': info['barrier'],
+                'stake': info['stake'],
+                'profit': profit,
+                'time': record['t']
+            })
+        elif kind == 'stop':
+            self.closed = True
+        elif kind == 'market':
+            self.current_market = record['new']
+            self.switches += 1
+
+    @property
+    def active(self):
+        # Anything worth resuming rather than starting over; a session the
+        # user stopped is finished
+        return not self.closed and bool(self.trade_count or self.pending)
+
+    def export_state(self):
+        return {
+            'closed': self.closed,
+            'paper': self.paper,
+            'current_market': self.current_market,
+            'trade_count': self.trade_count,
+            'profit_loss': self.profit_loss,
+            'wins': self.wins,
+            'losses': self.losses,
+            'switches': self.switches,
+            'start_time': self.start_time,
+            'market_performance': self.market_performance,
+            'pending': [[contract_id, info] for contract_id, info in self.pending.items()],
+            'history': list(self.history),
+            'risk': self.risk
+        }
+
+
+class Journal:
+    def __init__(self, directory, batch_size=64, flush_interval=0.5,
+                 snapshot_interval=1000, fsync=True):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+
+        self.engine = None
+        self.handle = None
+        self.buffer = []
+        self.seq = 0
+        self.since_snapshot = 0
+        # Length of the log up to its last complete record, once read
+        self.valid_size = None
+        self.closed = False
+
+    # Recovery
+
+    def recover(self, engine):
+        # Restores the last journaled session into ``engine``; returns what
+        # was found and how long it took
+        started = time.perf_counter()
+        snapshot = self.load_snapshot()
+        if snapshot is None:
+            state = engine.export_state()
+            self.seq = 0
+        else:
+            state = snapshot['state']
+            self.seq = snapshot['seq']
+
+        replay = SessionReplay(state)
+        replayed = 0
+        for record in self.read_records():
+            if record['seq'] <= self.seq:
+                continue
+            replay.apply(record)
+            self.seq = record['seq']
+            replayed += 1
+        self.since_snapshot = replayed
+
+        engine.restore_state(replay.export_state())
+        return {
+            'snapshot': snapshot is not None,
+            'replayed': replayed,
+            'active': replay.active,
+            'paper': replay.paper,
+            'trades': replay.trade_count,
+            'pending': len(replay.pending),
+            'seconds': time.perf_counter() - started
+        }
+
+    def load_snapshot(self):
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def read_records(self):
+        self.valid_size = 0
+        try:
+            handle = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with handle:
+            for line in handle:
+                # A crash mid-write leaves at most one torn line, at the end
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.valid_size += len(line)
+                yield record
+
+    # Writing
+
+    def attach(self, engine):
+        self.engine = engine
+        engine.subscribe("start", self.on_start)
+        engine.subscribe("stop", self.on_stop)
+        engine.subscribe("order", self.on_order)
+        engine.subscribe("contract", self.on_contract)
+        engine.subscribe("settle", self.on_settle)
+        engine.subscribe("market", self.on_market)
+
+    def on_start(self, resume):
+        if resume:
+            return
+        self.append('start', paper=self.engine.paper)
+        # Nothing before a fresh start is needed again
+        self.snapshot()
+
+    def on_stop(self):
+        self.append('stop')
+        self.flush()
+
+    def on_order(self, contract, order):
+        self.append('order', order=order)
+
+    def on_contract(self, contract_id, info):
+        self.append('open', contract_id=contract_id, info=info)
+
+    def on_settle(self, contract_id, profit, info):
+        self.append('settle', contract_id=contract_id, profit=profit,
+                    risk=self.engine.risk.export_state())
+
+    def on_market(self, old, new):
+        self.append('market', old=old, new=new)
+
+    def append(self, kind, **fields):
+        self.seq += 1
+        record = {'seq': self.seq, 't': time.time(), 'type': kind}
+        record.update(fields)
+        self.buffer.append(json.dumps(record, separators=(',', ':')))
+        self.since_snapshot += 1
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+        if self.since_snapshot >= self.snapshot_interval and self.engine is not None:
+            self.snapshot()
+
+    def open(self):
+        handle = open(self.path, 'ab')
+        # Cut a torn tail left by a crash so new records start on a fresh line
+        if self.valid_size is not None and handle.tell() > self.valid_size:
+            handle.truncate(self.valid_size)
+            handle.seek(0, os.SEEK_END)
+        return handle
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.handle is None:
+            self.handle = self.open()
+        self.handle.write(('\n'.join(self.buffer) + '\n').encode('utf-8'))
+        self.buffer.clear()
+        self.handle.flush()
+        if self.fsync:
+            os.fsync(self.handle.fileno())
+
+    def snapshot(self):
+        self.flush()
+        data = {'seq': self.seq, 'time': time.time(), 'state': self.engine.export_state()}
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle, separators=(',', ':'))
+            handle.flush()
+            if self.fsync:
+                os.fsync(handle.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        # Everything logged so far is in the snapshot now
+        if self.handle is None:
+            self.handle = self.open()
+        self.handle.truncate(0)
+        self.valid_size = 0
+        self.since_snapshot = 0
+
+    async def flush_loop(self):
+        while not self.closed:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        self.flush()
+        self.closed = True
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
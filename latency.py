@@ -0,0 +1,171 @@
+"""Low-overhead latency probes for the tick-to-trade path.
+
+``LatencyHistogram`` is an HDR-style log-linear histogram over nanosecond
+values: 32 linear sub-buckets per power of two (about 3% relative error),
+fixed memory, O(1) ``record``. ``LatencyProbes`` keeps one per market and
+stage and exports them as JSON or Prometheus text.
+
+Stages recorded by the client and engine:
+
+    decode           tick decode (or full parse) of an incoming frame
+    on_message       whole dispatch of a tick frame, listeners included
+    process_tick     DifferEngine.on_tick
+    detect_patterns  DifferEngine.detect_patterns
+    should_trade     DifferEngine.should_trade
+    execute_trade    DifferEngine.execute_trade
+    quote_to_buy     tick frame received -> buy request queued
+    send_queue       buy request queued -> written to the socket
+    buy_ack          buy request queued -> buy reply received
+"""
+
+import json
+import os
+import time
+from collections import defaultdict
+
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_SHIFT = 40
+BUCKETS = (MAX_SHIFT + 2) * SUB_BUCKETS
+
+QUANTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999))
+
+
+def bucket_index(value):
+    if value < 2 * SUB_BUCKETS:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BITS - 1
+    if shift > MAX_SHIFT:
+        return BUCKETS - 1
+    return (shift + 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def bucket_value(index):
+    # Midpoint of the values that land in ``index``
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    low = (index % SUB_BUCKETS + SUB_BUCKETS) << shift
+    return low + ((1 << shift) >> 1)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def percentile(self, quantile):
+        if not self.count:
+            return 0
+        target = quantile * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ns': self.total / self.count if self.count else 0,
+            'min_ns': self.min or 0,
+            'max_ns': self.max,
+            **{f"{name}_ns": self.percentile(quantile) for name, quantile in QUANTILES}
+        }
+
+
+class LatencyProbes:
+    def __init__(self):
+        self.histograms = defaultdict(LatencyHistogram)
+
+    def record(self, market, stage, nanoseconds):
+        self.histograms[(market, stage)].record(nanoseconds)
+
+    def instrument(self, engine):
+        # Times engine stages by wrapping the bound methods on this
+        # instance only; engines without probes pay nothing
+        clock = time.perf_counter_ns
+        record = self.record
+
+        def timed(stage, method, market_of):
+            def wrapper(*args):
+                started = clock()
+                result = method(*args)
+                record(market_of(args), stage, clock() - started)
+                return result
+            return wrapper
+
+        engine.on_tick = timed('process_tick', engine.on_tick,
+                               lambda args: args[1] if len(args) > 1 and args[1] else engine.current_market)
+        engine.detect_patterns = timed('detect_patterns', engine.detect_patterns,
+                                       lambda args: args[0].symbol)
+        engine.should_trade = timed('should_trade', engine.should_trade,
+                                    lambda args: args[0].symbol)
+        engine.execute_trade = timed('execute_trade', engine.execute_trade,
+                                     lambda args: args[1] if len(args) > 1 and args[1] else engine.current_market)
+        return engine
+
+    def markets(self):
+        return sorted({market for market, stage in self.histograms})
+
+    def stage_summary(self, stage):
+        # All markets merged
+        merged = LatencyHistogram()
+        for (market, name), histogram in list(self.histograms.items()):
+            if name == stage:
+                merged.merge(histogram)
+        return merged.summary()
+
+    def to_json(self):
+        result = defaultdict(dict)
+        for (market, stage), histogram in sorted(self.histograms.items()):
+            result[market][stage] = histogram.summary()
+        return dict(result)
+
+    def to_prometheus(self, prefix="differbot_latency_seconds"):
+        lines = [
+            f"# HELP {prefix} Tick-to-trade stage latency.",
+            f"# TYPE {prefix} summary"
+        ]
+        for (market, stage), histogram in sorted(self.histograms.items()):
+            labels = f'market="{market}",stage="{stage}"'
+            for name, quantile in QUANTILES:
+                lines.append(f'{prefix}{{{labels},quantile="{quantile}"}} '
+                             f'{histogram.percentile(quantile) / 1e9:.9f}')
+            lines.append(f"{prefix}_sum{{{labels}}} {histogram.total / 1e9:.9f}")
+            lines.append(f"{prefix}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, directory):
+        # Written to a temp file and renamed so scrapers never see half a file
+        os.makedirs(directory, exist_ok=True)
+        outputs = (('latency.json', json.dumps(self.to_json(), indent=2)),
+                   ('latency.prom', self.to_prometheus()))
+        for name, text in outputs:
+            path = os.path.join(directory, name)
+            with open(path + '.tmp', 'w') as handle:
+                handle.write(text)
+            os.replace(path + '.tmp', path)
@@ -0,0 +1,182 @@
+"""Pipelined DIGITDIFF orders over live proposal streams.
+
+``OrderPipeline`` keeps a ``proposal`` subscription open for every market
+and barrier it is told to ``watch`` (hosts pass each market's current
+rarest digits, the only barriers the engine trades), so a fresh quote is
+already on hand when a signal fires. A buy then goes out as
+``{"buy": <proposal id>, "price": <ask price>}``: the broker prices nothing
+on the order path, and a quote that has moved is refused at once instead of
+being filled at a different price. Proposal ids are single-use, so a quote
+is consumed by the order that uses it; without a fresh quote (a new barrier,
+a stream that has not answered yet, another stake) the order falls back to
+a full-parameter buy.
+
+Every order goes out under its own req_id and its reply is handed back with
+the order that produced it, so any number can be in flight at once and a
+reply that lands after a market switch is still booked where it was
+placed. Proposal streams die with the socket and are reopened on every
+authorize.
+"""
+
+import time
+from collections import Counter
+
+from engine import CONTRACT_TICKS
+
+# Oldest quote, in seconds, still bought by id; streams update every tick
+MAX_QUOTE_AGE = 3.0
+
+# Seconds a stream stays open after its barrier stops being watched, so
+# rarest digits that flap between ticks do not churn subscriptions
+STREAM_LINGER = 30.0
+
+
+class OrderPipeline:
+    def __init__(self, client, stake=1.0, currency="USD", max_quote_age=MAX_QUOTE_AGE,
+                 linger=STREAM_LINGER, clock=time.monotonic):
+        self.client = client
+        self.stake = stake
+        self.currency = currency
+        self.max_quote_age = max_quote_age
+        self.linger = linger
+        self.clock = clock
+
+        # market -> barriers as last passed to watch, and as stream keys
+        self.requested = {}
+        self.watched = {}
+        # (market, barrier) -> req_id of its proposal stream, its broker
+        # subscription id, and the latest (proposal_id, ask_price, received)
+        self.streams = {}
+        self.subscriptions = {}
+        self.quotes = {}
+        # (market, barrier) no longer watched -> when it was dropped
+        self.idle = {}
+
+        self.in_flight = {}
+        self.max_in_flight = 0
+        self.stats = Counter()
+        client.on("authorize", self.on_authorize)
+
+    # Proposal streams
+
+    def watch(self, market, barriers):
+        # Keeps streams open for exactly ``barriers`` on ``market``; cheap
+        # to call on every tick
+        if barriers == self.requested.get(market):
+            return
+        self.requested[market] = list(barriers)
+        barriers = [str(barrier) for barrier in barriers]
+        now = self.clock()
+        for barrier in self.watched.get(market, ()):
+            if barrier not in barriers:
+                self.idle[(market, barrier)] = now
+        self.watched[market] = barriers
+
+        for barrier in barriers:
+            key = (market, barrier)
+            self.idle.pop(key, None)
+            if key not in self.streams and self.client.ready:
+                self.open_stream(key)
+        for key, since in list(self.idle.items()):
+            if now - since > self.linger:
+                del self.idle[key]
+                self.close_stream(key)
+
+    def open_stream(self, key):
+        market, barrier = key
+        self.streams[key] = self.client.send({
+            "proposal": 1,
+            "subscribe": 1,
+            "amount": self.stake,
+            "basis": "stake",
+            "contract_type": "DIGITDIFF",
+            "currency": self.currency,
+            "duration": CONTRACT_TICKS,
+            "duration_unit": "t",
+            "symbol": market,
+            "barrier": barrier
+        }, lambda reply: self.on_quote(key, reply), persistent=True)
+
+    def close_stream(self, key):
+        req_id = self.streams.pop(key, None)
+        if req_id is not None:
+            self.client.forget(req_id)
+        self.quotes.pop(key, None)
+        subscription = self.subscriptions.pop(key, None)
+        if subscription:
+            self.client.send({"forget": subscription})
+
+    def on_quote(self, key, reply):
+        if "error" in reply:
+            # Dropped until the barrier is watched again or the session is
+            # re-authorized; orders fall back to full parameters meanwhile
+            self.stats['quote_errors'] += 1
+            self.client.forget(reply.get("req_id"))
+            self.streams.pop(key, None)
+            self.quotes.pop(key, None)
+            return
+        proposal = reply["proposal"]
+        self.quotes[key] = (proposal["id"], float(proposal["ask_price"]), self.clock())
+        subscription = reply.get("subscription", {}).get("id")
+        if subscription:
+            self.subscriptions[key] = subscription
+
+    def on_authorize(self, account):
+        # A new socket: the old streams and their quotes are gone, and only
+        # the watched barriers are reopened
+        self.streams.clear()
+        self.subscriptions.clear()
+        self.quotes.clear()
+        self.idle.clear()
+        for market, barriers in self.watched.items():
+            for barrier in barriers:
+                self.open_stream((market, barrier))
+
+    def set_stake(self, stake):
+        if stake == self.stake:
+            return
+        self.stake = stake
+        for key in list(self.streams):
+            self.close_stream(key)
+        self.idle.clear()
+        if self.client.ready:
+            self.on_authorize(None)
+
+    # Orders
+
+    def buy(self, contract, order, callback):
+        # ``contract`` is the full-parameter request, used without a quote;
+        # ``callback`` gets the broker's reply
+        key = (order['market'], order['barrier'])
+        quote = self.quotes.pop(key, None)
+        if (quote is not None and order['stake'] == self.stake
+                and self.clock() - quote[2] <= self.max_quote_age):
+            payload = {"buy": quote[0], "price": quote[1]}
+            self.stats['by_proposal'] += 1
+        else:
+            payload = contract
+            self.stats['by_parameters'] += 1
+
+        req_id = self.client.buy(payload, order['market'],
+                                 lambda reply: self.on_reply(reply, callback))
+        self.in_flight[req_id] = order
+        if len(self.in_flight) > self.max_in_flight:
+            self.max_in_flight = len(self.in_flight)
+        return req_id
+
+    def on_reply(self, reply, callback):
+        self.in_flight.pop(reply.get("req_id"), None)
+        if "error" in reply:
+            self.stats['rejected'] += 1
+            self.stats[f"rejected_{reply['error'].get('code')}"] += 1
+        else:
+            self.stats['acknowledged'] += 1
+        callback(reply)
+
+    def metrics(self):
+        return {
+            'streams': len(self.streams),
+            'in_flight': len(self.in_flight),
+            'max_in_flight': self.max_in_flight,
+            **self.stats
+        }
@@ -0,0 +1,163 @@
+"""Heavier dashboard panels, imported and built after the first frame.
+
+ColorBox, MarketPerformanceBar and LogArea pull in the graphics and
+recycle-view machinery the first screen does not need; ``differsmatch``
+imports this module once the window is up.
+"""
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.label import Label
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Rectangle
+from kivy.metrics import dp
+
+GREEN = (0, 0.8, 0, 1)
+RED = (0.8, 0, 0, 1)
+
+class ColorBox(BoxLayout):
+    # A fixed pool of swatches recoloured in place; nothing is rebuilt per update
+    def __init__(self, capacity=15, **kwargs):
+        super().__init__(**kwargs)
+        self.orientation = 'horizontal'
+        self.size_hint_y = None
+        self.height = dp(30)
+        self.spacing = dp(2)
+        self.shown = ()
+        self.swatches = []
+        
+        for _ in range(capacity):
+            box = Label(size_hint_x=0, opacity=0)
+            with box.canvas.before:
+                box.fill = Color(*GREEN)
+                box.rect = Rectangle(pos=box.pos, size=box.size)
+            box.bind(pos=self.update_rect, size=self.update_rect)
+            self.swatches.append(box)
+            self.add_widget(box)
+        
+    def update_colors(self, colors):
+        colors = tuple(colors[-len(self.swatches):])
+        if colors == self.shown:
+            return
+        self.shown = colors
+        
+        width = 1.0 / max(len(colors), 1)
+        for i, box in enumerate(self.swatches):
+            if i < len(colors):
+                box.fill.rgba = GREEN if colors[i] == 'green' else RED
+                box.size_hint_x = width
+                box.opacity = 1
+            else:
+                box.size_hint_x = 0
+                box.opacity = 0
+    
+    def update_rect(self, instance, value):
+        instance.rect.pos = instance.pos
+        instance.rect.size = instance.size
+
+class LogArea(RecycleView):
+    # Only the rows in view are real widgets; rows come from a LogBuffer that
+    # may have been filling since before this panel existed
+    def __init__(self, buffer, **kwargs):
+        super().__init__(**kwargs)
+        self.size_hint_y = None
+        self.height = dp(200)
+        self.viewclass = 'Label'
+        self.buffer = buffer
+        
+        self.layout = RecycleBoxLayout(
+            orientation='vertical',
+            size_hint_y=None,
+            default_size=(None, dp(30)),
+            default_size_hint=(1, None),
+            spacing=dp(2)
+        )
+        self.layout.bind(minimum_height=self.layout.setter('height'))
+        self.add_widget(self.layout)
+    
+    def flush(self):
+        if not self.buffer.pending:
+            return
+        self.buffer.pending = False
+        self.data = list(self.buffer.entries)
+        self.scroll_y = 0
+
+class MarketPerformanceBar(BoxLayout):
+    # One column per market, built on first use and then only resized/recoloured
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.orientation = 'horizontal'
+        self.size_hint_y = None
+        self.height = dp(100)
+        self.spacing = dp(5)
+        self.padding = dp(5)
+        self.columns = {}
+        self.shown = None
+        
+    def build_columns(self, available_markets):
+        self.clear_widgets()
+        self.columns = {}
+        
+        for market in available_markets:
+            bar_layout = BoxLayout(orientation='vertical', size_hint_x=1)
+            
+            # Profit label
+            profit_label = Label(
+                text="$0.00",
+                size_hint_y=0.2,
+                font_size=dp(10)
+            )
+            
+            # Bar container: the spacer takes whatever height the bar does not
+            bar_container = BoxLayout(orientation='vertical', size_hint_y=0.6)
+            spacer = Widget(size_hint_y=1)
+            bar = Label(size_hint_y=0)
+            
+            with bar.canvas.before:
+                bar.fill = Color(*GREEN)
+                bar.rect = Rectangle(pos=bar.pos, size=bar.size)
+            
+            bar.bind(pos=self.update_bar_rect, size=self.update_bar_rect)
+            bar_container.add_widget(spacer)
+            bar_container.add_widget(bar)
+            
+            # Market label
+            market_label = Label(
+                text=market,
+                size_hint_y=0.2,
+                font_size=dp(10),
+                bold=True
+            )
+            
+            bar_layout.add_widget(profit_label)
+            bar_layout.add_widget(bar_container)
+            bar_layout.add_widget(market_label)
+            
+            self.add_widget(bar_layout)
+            self.columns[market] = (profit_label, spacer, bar)
+        
+    def update_performance(self, market_performance, available_markets):
+        if market_performance == self.shown:
+            return
+        self.shown = market_performance
+        if list(self.columns) != list(available_markets):
+            self.build_columns(available_markets)
+        
+        max_profit = max(abs(market_performance[m]['profit']) for m in available_markets)
+        if max_profit == 0:
+            max_profit = 1
+            
+        for market in available_markets:
+            profit = market_performance[market]['profit']
+            profit_label, spacer, bar = self.columns[market]
+            
+            profit_label.text = f"${profit:.2f}"
+            height_ratio = abs(profit) / max_profit
+            bar.size_hint_y = height_ratio
+            spacer.size_hint_y = 1 - height_ratio
+            bar.fill.rgba = GREEN if profit >= 0 else RED
+    
+    def update_bar_rect(self, instance, value):
+        instance.rect.pos = instance.pos
+        instance.rect.size = instance.size
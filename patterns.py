@@ -0,0 +1,153 @@
+"""Tick pattern detection over packed digit-class registers.
+
+Each tick is reduced to a few bits by one or more views of its digit:
+
+    parity       G R     even (green) or odd (red); always present, bit 0
+    over_under   U O     under 5, or 5 and over
+    digit_class  L M H   0-2, 3-6, 7-9
+
+The codes of the latest ticks are shifted into one integer register, newest
+in the lowest bits, so keeping the history costs a shift, an or and a mask
+per tick.
+
+A pattern is a sequence over one view's alphabet, oldest tick first, with
+``?`` matching anything; several sequences can share a name (alternation
+may start on either colour). ``PatternSet.compile`` turns every registered
+sequence into a (mask, value) test on the register and, when the window is
+narrow enough, precomputes them into a table indexed by the register's low
+bits: classifying a tick is then one list index however many patterns are
+registered. Wider sets test the masks in registration order instead. The
+first registered match wins; MIXED (0) means nothing matched.
+"""
+
+COLOR_HISTORY = 15
+
+MIXED = 0
+
+# Largest lookup table a matcher will build, in entries
+TABLE_LIMIT = 1 << 16
+
+
+class View:
+    def __init__(self, name, alphabet, classify):
+        self.name = name
+        self.alphabet = alphabet
+        self.bits = max(1, (len(alphabet) - 1).bit_length())
+        self.codes = [classify(digit) for digit in range(10)]
+
+
+PARITY = View('parity', 'GR', lambda digit: digit % 2)
+OVER_UNDER = View('over_under', 'UO', lambda digit: int(digit >= 5))
+DIGIT_CLASS = View('digit_class', 'LMH', lambda digit: 0 if digit < 3 else 1 if digit < 7 else 2)
+
+VIEWS = {view.name: view for view in (PARITY, OVER_UNDER, DIGIT_CLASS)}
+
+
+class PatternSet:
+    def __init__(self):
+        self.names = ['mixed']
+        self.ids = {'mixed': MIXED}
+        self.views = [PARITY]
+        self.sequences = []
+
+    def register(self, name, *sequences, view=PARITY):
+        if isinstance(view, str):
+            view = VIEWS[view]
+        if not sequences:
+            raise ValueError(f"pattern {name!r} needs at least one sequence")
+        for sequence in sequences:
+            if not sequence or any(symbol != '?' and symbol not in view.alphabet
+                                   for symbol in sequence):
+                raise ValueError(f"bad {view.name} sequence for {name!r}: {sequence!r}")
+
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+        if view not in self.views:
+            self.views.append(view)
+        pattern_id = self.ids[name]
+        self.sequences.extend((pattern_id, view, sequence) for sequence in sequences)
+        return pattern_id
+
+    def register_many(self, patterns, view=PARITY):
+        # {name: sequence or [sequences]}, all over one view
+        for name, sequences in patterns.items():
+            if isinstance(sequences, str):
+                sequences = (sequences,)
+            self.register(name, *sequences, view=view)
+
+    def id(self, name):
+        if name not in self.ids:
+            raise ValueError(f"unknown pattern: {name!r}")
+        return self.ids[name]
+
+    def compile(self, history=COLOR_HISTORY):
+        return PatternMatcher(self, history)
+
+
+class PatternMatcher:
+    def __init__(self, patterns, history=COLOR_HISTORY):
+        self.names = tuple(patterns.names)
+
+        # Each view owns a fixed bit range of a tick's code, parity first
+        offsets = {}
+        bits = 0
+        for view in patterns.views:
+            offsets[view] = bits
+            bits += view.bits
+        self.bits = bits
+        self.codes = [sum(view.codes[digit] << offset for view, offset in offsets.items())
+                      for digit in range(10)]
+
+        self.length = max((len(sequence) for _, _, sequence in patterns.sequences), default=1)
+        self.window_mask = (1 << bits * self.length) - 1
+        self.history_mask = (1 << bits * max(history, self.length)) - 1
+
+        rules = []
+        for pattern_id, view, sequence in patterns.sequences:
+            mask = value = 0
+            for age, symbol in enumerate(reversed(sequence)):
+                if symbol == '?':
+                    continue
+                shift = age * bits + offsets[view]
+                mask |= ((1 << view.bits) - 1) << shift
+                value |= view.alphabet.index(symbol) << shift
+            rules.append((mask, value, pattern_id))
+        self.rules = tuple(rules)
+
+        self.table = None
+        if 1 << (bits * self.length) <= TABLE_LIMIT:
+            self.table = [self.scan(register) for register in range(1 << (bits * self.length))]
+
+    def push(self, register, digit):
+        return ((register << self.bits) | self.codes[digit]) & self.history_mask
+
+    def scan(self, register):
+        for mask, value, pattern_id in self.rules:
+            if register & mask == value:
+                return pattern_id
+        return MIXED
+
+    def classify(self, register):
+        if self.table is not None:
+            return self.table[register & self.window_mask]
+        return self.scan(register)
+
+    def colors(self, register, seen, count=COLOR_HISTORY):
+        # Oldest-to-newest "green"/"red" for the last ``count`` ticks
+        bits = self.bits
+        return ["red" if register >> (age * bits) & 1 else "green"
+                for age in range(min(seen, count) - 1, -1, -1)]
+
+
+def alternation(alphabet, length):
+    return (alphabet * length)[:length]
+
+
+def default_patterns(length):
+    # The original colour patterns, checked in this order
+    patterns = PatternSet()
+    patterns.register('alternating', alternation('GR', length), alternation('RG', length))
+    patterns.register('red_streak', 'R' * length)
+    patterns.register('green_streak', 'G' * length)
+    return patterns
@@ -0,0 +1,142 @@
+"""Pre-trade risk checks for ``DifferEngine``.
+
+``RiskEngine.check`` runs on every order before it is sent and only reads
+running aggregates (open exposure and count, today's realised P&L overall
+and per market, the consecutive-loss streak), so each check is O(1). The
+engine keeps them current through ``opened``/``cancelled``/``closed``.
+
+Limits left as None are not enforced:
+
+    max_open                 contracts open or in flight at once
+    max_exposure             total stake open or in flight
+    daily_loss               worst case for the day: realised loss plus every
+                             open stake plus the new one
+    market_loss              the same, per market
+    max_consecutive_losses   losses in a row before trading pauses for
+                             ``cooldown`` seconds
+
+Days roll over at midnight UTC by ``clock``. Every refused order is
+counted by reason and kept in ``recent``. ``export_state``/``restore_state``
+carry the day's figures, the loss streak and any cooldown across restarts;
+open exposure is rebuilt from the open contracts.
+"""
+
+import time
+from collections import Counter, defaultdict, deque
+
+DAY = 86400
+
+
+class RiskEngine:
+    def __init__(self, max_open=None, max_exposure=None, daily_loss=None, market_loss=None,
+                 max_consecutive_losses=None, cooldown=300.0, clock=time.time):
+        self.max_open = max_open
+        self.max_exposure = max_exposure
+        self.daily_loss = daily_loss
+        self.market_loss = market_loss
+        self.max_consecutive_losses = max_consecutive_losses
+        self.cooldown = cooldown
+        self.clock = clock
+
+        self.rejections = Counter()
+        self.recent = deque(maxlen=100)
+        self.clear_open()
+        self.day = None
+        self.roll_day(clock())
+        self.consecutive_losses = 0
+        self.cooldown_until = 0.0
+
+    def clear_open(self):
+        self.open_count = 0
+        self.exposure = 0.0
+        self.market_exposure = defaultdict(float)
+
+    def roll_day(self, now):
+        day = int(now // DAY)
+        if day != self.day:
+            self.day = day
+            self.daily_pnl = 0.0
+            self.market_pnl = defaultdict(float)
+
+    # Order path
+
+    def check(self, market, stake):
+        # Reason the order must not go out, or None
+        now = self.clock()
+        if now < self.cooldown_until:
+            return "cooldown"
+        if self.max_open is not None and self.open_count >= self.max_open:
+            return "max_open"
+        if self.max_exposure is not None and self.exposure + stake > self.max_exposure:
+            return "max_exposure"
+
+        self.roll_day(now)
+        if (self.daily_loss is not None
+                and self.exposure + stake - self.daily_pnl > self.daily_loss):
+            return "daily_loss"
+        if (self.market_loss is not None
+                and self.market_exposure[market] + stake - self.market_pnl[market] > self.market_loss):
+            return "market_loss"
+        return None
+
+    def reject(self, market, stake, reason):
+        self.rejections[reason] += 1
+        self.recent.append((self.clock(), market, stake, reason))
+
+    # Aggregates
+
+    def opened(self, market, stake):
+        self.open_count += 1
+        self.exposure += stake
+        self.market_exposure[market] += stake
+
+    def cancelled(self, market, stake):
+        self.open_count -= 1
+        self.exposure -= stake
+        self.market_exposure[market] -= stake
+
+    def closed(self, market, stake, profit):
+        self.cancelled(market, stake)
+        now = self.clock()
+        self.roll_day(now)
+        self.daily_pnl += profit
+        self.market_pnl[market] += profit
+
+        if profit > 0:
+            self.consecutive_losses = 0
+            return
+        self.consecutive_losses += 1
+        if (self.max_consecutive_losses is not None
+                and self.consecutive_losses >= self.max_consecutive_losses):
+            self.consecutive_losses = 0
+            self.cooldown_until = now + self.cooldown
+
+    # Persistence
+
+    def export_state(self):
+        return {
+            'day': self.day,
+            'daily_pnl': self.daily_pnl,
+            'market_pnl': dict(self.market_pnl),
+            'consecutive_losses': self.consecutive_losses,
+            'cooldown_until': self.cooldown_until
+        }
+
+    def restore_state(self, state):
+        self.day = state['day']
+        self.daily_pnl = state['daily_pnl']
+        self.market_pnl = defaultdict(float, state['market_pnl'])
+        self.consecutive_losses = state['consecutive_losses']
+        self.cooldown_until = state['cooldown_until']
+        # Figures from a day that has since ended no longer count
+        self.roll_day(self.clock())
+
+    def summary(self):
+        return {
+            'open': self.open_count,
+            'exposure': self.exposure,
+            'daily_pnl': self.daily_pnl,
+            'consecutive_losses': self.consecutive_losses,
+            'cooldown': max(0.0, self.cooldown_until - self.clock()),
+            'rejections': dict(self.rejections)
+        }
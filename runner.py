@@ -0,0 +1,187 @@
+"""Run many strategy instances in one process.
+
+Each instance is its own ``DifferEngine`` (token, markets, stake and limits)
+trading all of its markets in parallel. Market data comes over one shared
+tick connection and is fanned out to every instance watching the symbol;
+orders go over one authorized connection per account, shared by every
+instance using that token, each instance buying from its own proposal
+streams (see ``orders``). Everything runs on a single asyncio loop, so
+each engine still has exactly one writer.
+
+    python runner.py accounts.json
+
+with a config such as::
+
+    {"instances": [
+        {"name": "main", "token": "...", "markets": ["R_10", "R_25"], "stake": 1,
+         "risk": {"max_open": 3, "daily_loss": 50, "max_consecutive_losses": 4}},
+        {"name": "paper-wide", "paper": true, "markets": ["R_50", "R_75", "R_100"]}
+    ]}
+"""
+
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+
+from derivclient import WS_ENDPOINT, DerivClient
+from engine import DEFAULT_MARKETS, DifferEngine
+from orders import OrderPipeline
+from risk import RiskEngine
+from session import PAPER_BALANCE, AccountSession
+
+
+class BotInstance:
+    def __init__(self, name, engine, account=None, balance=None, pipeline=None):
+        self.name = name
+        self.engine = engine
+        self.account = account
+        self.balance = balance
+        self.pipeline = pipeline
+
+    def summary(self):
+        engine = self.engine
+        return {
+            'name': self.name,
+            'paper': engine.paper,
+            'markets': list(engine.available_markets),
+            'balance': engine.balance,
+            'profit_loss': engine.profit_loss,
+            'trades': engine.trade_count,
+            'wins': engine.wins,
+            'losses': engine.losses,
+            'open': len(engine.pending_contracts),
+            'rejected': sum(engine.risk.rejections.values())
+        }
+
+
+class Runner:
+    def __init__(self, endpoint=WS_ENDPOINT):
+        self.endpoint = endpoint
+        self.feed = DerivClient(endpoint)
+        self.feed.on("tick", self.on_tick)
+        # Paper instances are connected while the tick feed is
+        self.feed_session = AccountSession(self.feed)
+        self.accounts = {}
+        self.sessions = {}
+        self.instances = []
+        self.by_market = defaultdict(list)
+
+    def add_instance(self, name, token=None, markets=DEFAULT_MARKETS, paper=False,
+                     balance=None, risk=None, **params):
+        if isinstance(risk, dict):
+            risk = RiskEngine(**risk)
+        engine = DifferEngine(markets=markets, paper=paper, parallel=True, risk=risk, **params)
+        engine.subscribe("log", lambda message, level: print(f"[{name}] {message}"))
+
+        account = None
+        pipeline = None
+        if paper:
+            self.feed_session.add(engine)
+        else:
+            if not token:
+                raise ValueError(f"instance {name!r} needs a token or paper=true")
+            account = self.account(token)
+            # Each instance quotes its own stake over the shared connection
+            pipeline = OrderPipeline(account, engine.stake)
+            self.sessions[token].add(engine, pipeline, balance)
+
+        instance = BotInstance(name, engine, account, balance, pipeline)
+        self.instances.append(instance)
+        for market in engine.available_markets:
+            self.by_market[market].append(instance)
+        return instance
+
+    def account(self, token):
+        # One authorized connection per token, shared by its instances
+        if token not in self.accounts:
+            client = DerivClient(self.endpoint, token)
+            self.accounts[token] = client
+            self.sessions[token] = AccountSession(client)
+        return self.accounts[token]
+
+    def on_tick(self, symbol, tick):
+        digit = tick["digit"]
+        for instance in self.by_market.get(symbol, ()):
+            engine = instance.engine
+            engine.on_tick(digit, symbol)
+            if instance.pipeline is not None:
+                instance.pipeline.watch(symbol, engine.markets[symbol].rarest_digits)
+
+    async def run(self, status_interval=None):
+        for instance in self.instances:
+            instance.engine.start()
+            if instance.engine.paper:
+                instance.engine.set_balance(
+                    instance.balance if instance.balance is not None else PAPER_BALANCE)
+
+        self.feed.subscribe_ticks(sorted(self.by_market))
+        tasks = [asyncio.ensure_future(self.feed.run())]
+        tasks += [asyncio.ensure_future(client.run()) for client in self.accounts.values()]
+        if status_interval:
+            tasks.append(asyncio.ensure_future(self.report_loop(status_interval)))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stop(self):
+        for instance in self.instances:
+            instance.engine.stop()
+        self.feed.close()
+        for client in self.accounts.values():
+            client.close()
+
+    async def report_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            print(format_summary(self.summary()))
+
+    def summary(self):
+        instances = [instance.summary() for instance in self.instances]
+        return {
+            'instances': instances,
+            'profit_loss': sum(item['profit_loss'] for item in instances),
+            'trades': sum(item['trades'] for item in instances),
+            'wins': sum(item['wins'] for item in instances),
+            'losses': sum(item['losses'] for item in instances),
+            'open': sum(item['open'] for item in instances),
+            'rejected': sum(item['rejected'] for item in instances)
+        }
+
+
+def format_summary(summary):
+    lines = [f"{'Instance':<16}{'Trades':>8}{'W/L':>10}{'Open':>6}{'Rej':>6}{'P&L':>11}"]
+    for item in summary['instances']:
+        lines.append(f"{item['name']:<16}{item['trades']:>8}{item['wins']:>5}/{item['losses']:<4}"
+                     f"{item['open']:>6}{item['rejected']:>6}{item['profit_loss']:>+11.2f}")
+    lines.append(f"{'TOTAL':<16}{summary['trades']:>8}{summary['wins']:>5}/{summary['losses']:<4}"
+                 f"{summary['open']:>6}{summary['rejected']:>6}{summary['profit_loss']:>+11.2f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several differ bots in one process")
+    parser.add_argument('config', help="JSON file with an 'instances' list")
+    parser.add_argument('--endpoint', default=WS_ENDPOINT)
+    parser.add_argument('--status-interval', type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    with open(args.config) as handle:
+        config = json.load(handle)
+
+    runner = Runner(config.get('endpoint', args.endpoint))
+    for index, spec in enumerate(config['instances']):
+        spec = dict(spec)
+        runner.add_instance(spec.pop('name', f"bot{index + 1}"), **spec)
+
+    try:
+        asyncio.run(runner.run(args.status_interval))
+    except KeyboardInterrupt:
+        pass
+    print(format_summary(runner.summary()))
+
+
+if __name__ == '__main__':
+    main()
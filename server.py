@@ -0,0 +1,416 @@
+"""Local HTTP/WebSocket service around one ``DifferEngine``.
+
+    python server.py --paper --start
+    python server.py --token ... --port 8080 --publish-hz 4
+    python server.py --paper --endpoint ws://127.0.0.1:8765    # simulator
+
+One Deriv connection feeds one engine, so every tick is analysed once
+however many viewers are connected. ``GET /`` serves ``index.html``
+(open ``/?server`` to have it show this engine instead of trading from the
+browser), ``GET /state?key=...`` the current state and ``GET /stats?key=...``
+the server's counters as JSON, and ``/ws`` streams the state:
+
+    {"type": "full", "seq": n, "state": {...}}
+    {"type": "delta", "seq": n, "set": {...}, "del": [...], "ticks": [...]}
+    {"type": "log", "message": ..., "level": ...}
+
+State is flat: top-level figures plus ``markets.<symbol>.<field>`` for
+each market's rarest digits, pattern, recent colours ("GRRG...", oldest
+first) and performance. A delta carries only the paths whose value
+changed since the previous frame, and the ticks received since then as
+[symbol, epoch, quote, digit]. Frames go out at most ``publish_hz`` times a
+second and are encoded once for every viewer. A viewer whose send queue
+backs up past ``queue_limit`` frames has it cleared and gets a fresh full
+state instead, so a slow client holds up neither the others nor the
+engine. ``apply_frame`` folds frames into a state dict for Python viewers.
+
+Viewers control the engine with {"command": "start", "stake": 1,
+"max_trades": 10, "key": ...}, "stop", "force_trade" and "switch_market".
+Commands must carry the server's key, a secret made for each run (or set
+with --key) and printed in the ``/?server&key=...`` URL, and ``/ws`` only
+accepts browser connections from the server's own origin (plus any
+--allow-origin), so other pages open in the same browser can neither trade
+nor watch. Clients that send no Origin, like Python viewers, are accepted.
+Every request must name this server in its Host header, which shuts out
+pages that rebind their own DNS name to it.
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import math
+import os
+import secrets
+from collections import Counter, deque
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+from derivclient import WS_ENDPOINT, DerivClient
+from engine import DEFAULT_MARKETS, DifferEngine
+from journal import Journal
+from orders import OrderPipeline
+from session import PAPER_BALANCE, AccountSession
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX = os.path.join(ROOT, 'index.html')
+
+# Ticks kept for the next delta; older ones are dropped under load
+TICK_BATCH = 1000
+
+COMMANDS = ('start', 'stop', 'force_trade', 'switch_market')
+
+
+def encode(frame):
+    return json.dumps(frame, separators=(',', ':'))
+
+
+def engine_state(engine):
+    # Flat, JSON-safe view of everything viewers draw
+    matcher = engine.matcher
+    state = {
+        'running': engine.running,
+        'connected': engine.connected,
+        'paper': engine.paper,
+        'market': engine.current_market,
+        'symbols': list(engine.available_markets),
+        'balance': round(engine.balance, 2),
+        'profit_loss': round(engine.profit_loss, 2),
+        'trade_count': engine.trade_count,
+        'max_trades': engine.max_trades,
+        'wins': engine.wins,
+        'losses': engine.losses,
+        'switches': engine.market_switch_counter,
+        'pending': len(engine.pending_contracts)
+    }
+    for symbol, market in engine.markets.items():
+        performance = engine.market_performance[symbol]
+        prefix = f"markets.{symbol}."
+        state[prefix + 'rarest'] = list(market.rarest_digits)
+        state[prefix + 'pattern'] = matcher.names[market.pattern] if market.pattern is not None else None
+        state[prefix + 'colors'] = ''.join('G' if color == 'green' else 'R'
+                                           for color in matcher.colors(market.history, market.seen))
+        state[prefix + 'wins'] = performance['wins']
+        state[prefix + 'losses'] = performance['losses']
+        state[prefix + 'profit'] = round(performance['profit'], 2)
+    return state
+
+
+def start_options(request):
+    # Stake and max_trades from a viewer's start command, checked before
+    # they reach the engine; None keeps the engine's current value
+    stake = request.get('stake')
+    max_trades = request.get('max_trades')
+    if stake is not None:
+        if isinstance(stake, bool):
+            raise ValueError("stake must be a number")
+        stake = float(stake)
+        if not math.isfinite(stake) or stake <= 0:
+            raise ValueError("stake must be greater than 0")
+    if max_trades is not None:
+        count = float(max_trades)
+        if isinstance(max_trades, bool) or not math.isfinite(count) or count != int(count):
+            raise ValueError("max_trades must be a whole number")
+        max_trades = int(count)
+        if max_trades < 1:
+            raise ValueError("max_trades must be at least 1")
+    return stake, max_trades, bool(request.get('resume', False))
+
+
+def apply_frame(state, frame):
+    # Folds a full or delta frame into ``state``; returns the frame's ticks
+    if frame['type'] == 'full':
+        state.clear()
+        state.update(frame['state'])
+    elif frame['type'] == 'delta':
+        state.update(frame['set'])
+        for path in frame.get('del', ()):
+            state.pop(path, None)
+    return frame.get('ticks', [])
+
+
+class Viewer:
+    def __init__(self, ws, queue_limit):
+        self.ws = ws
+        self.queue_limit = queue_limit
+        self.outbox = asyncio.Queue()
+
+    def push(self, frame):
+        # False once the queue is over its limit; the caller resyncs
+        if self.outbox.qsize() >= self.queue_limit:
+            return False
+        self.outbox.put_nowait(frame)
+        return True
+
+    def reset(self, frame):
+        while not self.outbox.empty():
+            self.outbox.get_nowait()
+        self.outbox.put_nowait(frame)
+
+    async def write_loop(self):
+        while True:
+            frame = await self.outbox.get()
+            await self.ws.send(frame)
+
+
+class StateServer:
+    def __init__(self, engine, client, pipeline=None, publish_hz=4.0, queue_limit=32,
+                 index=INDEX, key=None, allow_origins=()):
+        self.engine = engine
+        self.client = client
+        self.pipeline = pipeline
+        self.publish_interval = 1.0 / publish_hz
+        self.queue_limit = queue_limit
+        self.index = index
+        self.key = key or secrets.token_urlsafe(16)
+        self.allow_origins = list(allow_origins)
+        # Host headers accepted, set by ``serve``
+        self.hosts = set()
+
+        self.viewers = set()
+        self.seq = 0
+        self.state = engine_state(engine)
+        self.full_frame = None
+        self.published_version = engine.version
+        self.ticks = deque(maxlen=TICK_BATCH)
+        self.stats = Counter()
+
+        engine.subscribe("log", self.on_log)
+        client.on("tick", self.on_tick)
+
+    # Engine side
+
+    def on_tick(self, symbol, tick):
+        self.engine.on_tick(tick["digit"], symbol)
+        if self.pipeline is not None:
+            self.pipeline.watch(symbol, self.engine.markets[symbol].rarest_digits)
+        if self.viewers:
+            self.ticks.append([symbol, tick["epoch"], tick["quote"], tick["digit"]])
+
+    def on_log(self, message, level):
+        if self.viewers:
+            self.broadcast(encode({'type': 'log', 'message': message, 'level': level}))
+
+    def authorized(self, key):
+        if isinstance(key, str) and hmac.compare_digest(key, self.key):
+            return True
+        self.stats['unauthorized'] += 1
+        return False
+
+    def command(self, request):
+        if not self.authorized(request.get('key')):
+            raise PermissionError("command rejected: missing or wrong key")
+        name = request.get('command')
+        if name not in COMMANDS:
+            raise ValueError(f"unknown command: {name!r}")
+        engine = self.engine
+        if name == 'start':
+            # A fresh start clears the open contracts of the running session
+            if engine.running:
+                raise ValueError("already running; stop the session first")
+            engine.start(*start_options(request))
+            if engine.paper:
+                engine.set_balance(PAPER_BALANCE)
+            if self.pipeline is not None:
+                self.pipeline.set_stake(engine.stake)
+        elif name == 'stop':
+            engine.stop()
+        elif name == 'force_trade':
+            engine.force_trade()
+        elif name == 'switch_market':
+            engine.switch_market()
+
+    # Publishing
+
+    def full(self):
+        if self.full_frame is None:
+            self.full_frame = encode({'type': 'full', 'seq': self.seq, 'state': self.state})
+        return self.full_frame
+
+    def publish(self):
+        # One diff and one encoding per interval, whatever the viewer count
+        engine = self.engine
+        if engine.version == self.published_version and not self.ticks:
+            return
+        self.published_version = engine.version
+        state = engine_state(engine)
+        old = self.state
+        changed = {path: value for path, value in state.items()
+                   if path not in old or old[path] != value}
+        removed = [path for path in old if path not in state]
+        if not changed and not removed and not self.ticks:
+            return
+
+        self.seq += 1
+        self.state = state
+        self.full_frame = None
+        frame = {'type': 'delta', 'seq': self.seq, 'set': changed}
+        if removed:
+            frame['del'] = removed
+        if self.ticks:
+            frame['ticks'] = list(self.ticks)
+            self.ticks.clear()
+        self.broadcast(encode(frame))
+        self.stats['frames'] += 1
+
+    def broadcast(self, frame):
+        for viewer in self.viewers:
+            if not viewer.push(frame):
+                viewer.reset(self.full())
+                self.stats['resyncs'] += 1
+        self.stats['bytes'] += len(frame) * len(self.viewers)
+
+    async def publish_loop(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            self.publish()
+
+    # Connections
+
+    def process_request(self, connection, request):
+        # A page on another site that rebinds its name to this address
+        # still sends its own Host
+        if self.hosts and request.headers.get('Host') not in self.hosts:
+            return connection.respond(403, "Forbidden\n")
+        url = urlsplit(request.path)
+        path = url.path
+        if path == '/ws':
+            return None
+        if path in ('/state', '/stats') and not self.authorized(parse_qs(url.query).get('key', [None])[0]):
+            return connection.respond(403, "Forbidden\n")
+        if path == '/state':
+            return self.respond(connection, self.full(), 'application/json')
+        if path == '/stats':
+            return self.respond(connection, encode(self.metrics()), 'application/json')
+        if path in ('/', '/index.html'):
+            with open(self.index, encoding='utf-8') as handle:
+                return self.respond(connection, handle.read(), 'text/html; charset=utf-8')
+        return connection.respond(404, "Not found\n")
+
+    def respond(self, connection, body, content_type):
+        response = connection.respond(200, body)
+        del response.headers['Content-Type']
+        response.headers['Content-Type'] = content_type
+        return response
+
+    async def handler(self, ws):
+        viewer = Viewer(ws, self.queue_limit)
+        viewer.push(self.full())
+        self.viewers.add(viewer)
+        self.stats['connections'] += 1
+        writer = asyncio.ensure_future(viewer.write_loop())
+        try:
+            async for message in ws:
+                try:
+                    self.command(json.loads(message))
+                except (ValueError, TypeError, AttributeError, PermissionError) as error:
+                    viewer.push(encode({'type': 'error', 'message': str(error)}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            writer.cancel()
+            self.viewers.discard(viewer)
+
+    def metrics(self):
+        metrics = {
+            'viewers': len(self.viewers),
+            'seq': self.seq,
+            'version': self.engine.version,
+            **self.stats
+        }
+        if self.pipeline is not None:
+            metrics['orders'] = self.pipeline.metrics()
+        return metrics
+
+    def origins(self, host, port):
+        # Browsers always send Origin; only pages served from here may connect
+        hosts = {host, "127.0.0.1", "localhost"}
+        return [f"http://{name}:{port}" for name in sorted(hosts)] + self.allow_origins + [None]
+
+    def host_names(self, host, port):
+        names = {f"{name}:{port}" for name in (host, "127.0.0.1", "localhost")}
+        names.update(urlsplit(origin).netloc for origin in self.allow_origins)
+        return names
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        self.hosts = self.host_names(host, port)
+        async with websockets.serve(self.handler, host, port, ping_interval=None,
+                                    origins=self.origins(host, port),
+                                    process_request=self.process_request):
+            tasks = [asyncio.ensure_future(self.publish_loop()),
+                     asyncio.ensure_future(self.client.run())]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the strategy engine to local viewers")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--endpoint', default=os.environ.get('DERIV_ENDPOINT', WS_ENDPOINT))
+    parser.add_argument('--token', default=os.environ.get('DERIV_TOKEN', ""))
+    parser.add_argument('--paper', action='store_true', help="simulate orders against live ticks")
+    parser.add_argument('--markets', nargs='+', default=list(DEFAULT_MARKETS))
+    parser.add_argument('--stake', type=float, default=1.0)
+    parser.add_argument('--max-trades', type=int, default=10)
+    parser.add_argument('--start', action='store_true', help="start trading right away")
+    parser.add_argument('--journal', metavar='DIR', help="journal the session and resume it")
+    parser.add_argument('--publish-hz', type=float, default=4.0)
+    parser.add_argument('--queue-limit', type=int, default=32, help="frames queued per viewer")
+    parser.add_argument('--key', default=os.environ.get('SERVER_KEY'),
+                        help="secret viewers send with commands (random per run by default)")
+    parser.add_argument('--allow-origin', action='append', default=[], metavar='ORIGIN',
+                        help="another page origin allowed to connect to /ws")
+    args = parser.parse_args(argv)
+
+    if not args.paper and not args.token:
+        parser.error("--token (or DERIV_TOKEN) is required unless --paper is set")
+
+    engine = DifferEngine(markets=args.markets, stake=args.stake, max_trades=args.max_trades,
+                          paper=args.paper)
+    client = DerivClient(args.endpoint, token="" if args.paper else args.token)
+    pipeline = None if args.paper else OrderPipeline(client, args.stake)
+    session = AccountSession(client)
+    session.add(engine, pipeline)
+    client.on("error", lambda error: engine.log(f"Error: {error.get('message')}", "error"))
+    client.subscribe_ticks(engine.available_markets)
+
+    resume = False
+    if args.journal:
+        journal = Journal(args.journal)
+        recovery = journal.recover(engine)
+        resume = recovery['active']
+        if resume and recovery['paper'] is not None and recovery['paper'] != args.paper:
+            mode = "paper" if recovery['paper'] else "live"
+            parser.error(f"{args.journal} holds a {mode} session; resume it in {mode} mode")
+        journal.attach(engine)
+    if args.start:
+        engine.start(resume=resume)
+        if args.paper:
+            engine.set_balance(PAPER_BALANCE)
+
+    server = StateServer(engine, client, pipeline, args.publish_hz, args.queue_limit,
+                         key=args.key, allow_origins=args.allow_origin)
+    print(f"Serving on http://{args.host}:{args.port}/?server&key={server.key} (stream at /ws)")
+
+    async def run():
+        tasks = [asyncio.ensure_future(server.serve(args.host, args.port))]
+        if args.journal:
+            tasks.append(asyncio.ensure_future(journal.flush_loop()))
+        await asyncio.gather(*tasks)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.journal:
+            journal.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Wiring between a ``DerivClient`` and the engines trading over it.
+
+``AccountSession`` is the one place the app, ``server`` and ``runner``
+connect a client to their ``DifferEngine``s:
+
+    orders      each engine's ``order`` events go out through its
+                ``OrderPipeline`` and the replies come back to ``on_buy``
+    contracts   acknowledged contracts are streamed into
+                ``on_contract_update``; paper contracts settle inside the
+                engine and are not streamed
+    authorize   every authorize (the first, and after each reconnect or a
+                journal resume) syncs balances from the account, reopens the
+                streams of open contracts and, if buys lost their reply with
+                the old socket, reconciles the account's contracts
+    open/close  paper engines count as connected while the socket is open,
+                live ones from authorize until it closes
+
+Engines sharing one account split its balance evenly unless given their
+own. All callbacks run on the client's loop, which must be the engines'
+single writer.
+"""
+
+# Starting balance of a paper session
+PAPER_BALANCE = 1000.0
+
+
+class AccountSession:
+    def __init__(self, client):
+        self.client = client
+        # (engine, balance, engine listeners) per engine
+        self.members = []
+        client.on("open", self.on_open)
+        client.on("authorize", self.on_authorize)
+        client.on("close", self.on_close)
+
+    @property
+    def engines(self):
+        return [engine for engine, _, _ in self.members]
+
+    def add(self, engine, pipeline=None, balance=None):
+        listeners = [("contract", lambda contract_id, info: self.track(engine, contract_id))]
+        if pipeline is not None:
+            listeners.append(("order", lambda contract, order: pipeline.buy(
+                contract, order, lambda reply: engine.on_buy(reply, order))))
+        for event, callback in listeners:
+            engine.subscribe(event, callback)
+        self.members.append((engine, balance, listeners))
+
+    def close(self):
+        # Detaches every engine; the client is left to its owner
+        for engine, _, listeners in self.members:
+            for event, callback in listeners:
+                engine.unsubscribe(event, callback)
+        self.members = []
+
+    # Client events
+
+    def on_open(self):
+        for engine in self.engines:
+            if engine.paper and not engine.connected:
+                engine.set_connected(True)
+
+    def on_authorize(self, account):
+        live = [(engine, balance) for engine, balance, _ in self.members if not engine.paper]
+        share = float(account['balance']) / max(len(live), 1)
+        for engine, balance in live:
+            engine.set_account_balance(balance if balance is not None else share)
+            engine.set_connected(True)
+            # Contract streams die with the socket; the first update of a
+            # new stream settles anything sold while we were offline
+            for contract_id in list(engine.pending_contracts):
+                self.track(engine, contract_id)
+
+        # Buys whose reply was lost with the old socket may have been filled
+        since = [engine.unknown_since() for engine, _ in live if engine.unknown]
+        if since:
+            self.client.fetch_contracts(min(since), self.reconcile)
+
+    def on_close(self):
+        for engine in self.engines:
+            engine.set_connected(False)
+
+    # Contracts
+
+    def track(self, engine, contract_id):
+        if not engine.paper:
+            self.client.track_contract(contract_id, engine.on_contract_update)
+
+    def reconcile(self, open_contracts, sold_contracts):
+        # The account's contracts include those of every engine on it, so
+        # each engine only adopts what none of the others already owns
+        known = set()
+        for engine in self.engines:
+            known.update(engine.pending_contracts)
+            known.update(trade['contract_id'] for trade in engine.trade_history)
+        for engine in self.engines:
+            if engine.unknown:
+                engine.reconcile(open_contracts, sold_contracts, known)
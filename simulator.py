@@ -0,0 +1,613 @@
+"""Local stand-in for the Deriv WebSocket API.
+
+Serves the calls the bot makes (authorize, ticks, forget, forget_all, buy,
+proposal, proposal_open_contract, portfolio, profit_table, ping) so it can be load tested without
+touching the real service or its tick rates:
+
+    python simulator.py --rate 2000 --latency 0.02 --error-rate 0.05
+    DERIV_ENDPOINT=ws://127.0.0.1:8765 python differsmatch.py
+    python runner.py accounts.json --endpoint ws://127.0.0.1:8765
+
+Tick streams are ``random`` (a random walk per market at ``--rate`` ticks a
+second), ``replay`` (recorded ticks from a ``tickstore`` directory, looped)
+or ``bursty`` (random ticks at ``--burst-rate`` for ``--burst-seconds``,
+then ``--rate`` for ``--quiet-seconds``). Replies can be delayed, buys and
+proposals failed at random, and connections dropped without a close frame.
+
+DIGITDIFF contracts settle like paper trading: on the CONTRACT_TICKS-th
+tick of their market, winning PAPER_PROFIT_RATIO of the stake if its digit
+differs from the barrier. Balances are kept per token across reconnects.
+Each connection has its own send queue; ticks that find it longer than
+``--queue-limit`` frames are dropped and counted, replies never are.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+
+import websockets
+
+from engine import CONTRACT_TICKS, DEFAULT_MARKETS, PAPER_PROFIT_RATIO
+from tickdecode import last_digit
+
+PIP_SIZES = {"R_10": 3, "R_25": 3, "R_50": 4, "R_75": 4, "R_100": 2}
+DEFAULT_PIP_SIZE = 2
+
+TICK_MODES = ("random", "replay", "bursty")
+
+# Upper bound on one tick-loop sleep, so rate changes apply promptly
+MAX_TICK_SLEEP = 0.1
+
+# Seconds a one-off (unsubscribed) proposal id stays buyable
+PROPOSAL_TTL = 5.0
+
+# Sold contracts kept for proposal_open_contract and profit_table
+SOLD_CONTRACTS = 10000
+
+INJECTED_ERRORS = (
+    ("RateLimit", "You have reached the rate limit for buy."),
+    ("ContractBuyValidationError", "Contract could not be validated."),
+    ("InvalidContractProposal", "Price has moved.")
+)
+
+
+def error_reply(request, code, message):
+    return dict(reply_base(request, next(iter(request), "error")),
+                error={"code": code, "message": message})
+
+
+def reply_base(request, msg_type):
+    base = {"echo_req": request, "msg_type": msg_type}
+    if "req_id" in request:
+        base["req_id"] = request["req_id"]
+    return base
+
+
+class RandomTicks:
+    def __init__(self, symbol, rng):
+        self.symbol = symbol
+        self.pip_size = PIP_SIZES.get(symbol, DEFAULT_PIP_SIZE)
+        self.rng = rng
+        self.quote = rng.uniform(1000, 9000)
+
+    def next(self):
+        self.quote = max(1.0, self.quote + self.rng.gauss(0, 1))
+        return int(time.time()), round(self.quote, self.pip_size)
+
+
+class ReplayTicks:
+    # Loops one market of a tick store, forever
+    def __init__(self, store, symbol):
+        self.store = store
+        self.symbol = symbol
+        self.pip_size = PIP_SIZES.get(symbol, DEFAULT_PIP_SIZE)
+        self.ticks = iter(())
+
+    def next(self):
+        for _ in range(2):
+            for epoch, quote, digit in self.ticks:
+                return epoch, quote
+            self.ticks = self.store.ticks(self.symbol)
+        raise ValueError(f"no recorded ticks for {self.symbol}")
+
+
+class Session:
+    def __init__(self, simulator, ws):
+        self.simulator = simulator
+        self.ws = ws
+        self.outbox = asyncio.Queue()
+        self.account = None
+        self.subscriptions = {}
+
+    def push(self, payload):
+        self.outbox.put_nowait(json.dumps(payload, separators=(',', ':')))
+
+    def push_tick(self, frame):
+        if self.outbox.qsize() >= self.simulator.queue_limit:
+            self.simulator.stats['dropped'] += 1
+            return
+        self.outbox.put_nowait(frame)
+
+    async def write_loop(self):
+        while True:
+            frame = await self.outbox.get()
+            await self.ws.send(frame)
+
+    def subscribe(self, kind, key, request):
+        subscription_id = uuid.uuid4().hex
+        self.subscriptions[subscription_id] = (kind, key, request)
+        self.simulator.watchers[kind, key].add((self, subscription_id))
+        return subscription_id
+
+    def forget(self, subscription_id):
+        entry = self.subscriptions.pop(subscription_id, None)
+        if entry is None:
+            return False
+        kind, key, request = entry
+        self.simulator.watchers[kind, key].discard((self, subscription_id))
+        if kind == "proposal":
+            self.simulator.drop_quote(self, subscription_id)
+        return True
+
+    def forget_all(self, kinds=None):
+        forgotten = [subscription_id for subscription_id, (kind, _, _) in self.subscriptions.items()
+                     if kinds is None or kind in kinds]
+        for subscription_id in forgotten:
+            self.forget(subscription_id)
+        return forgotten
+
+
+class Simulator:
+    def __init__(self, markets=DEFAULT_MARKETS, mode="random", store=None, rate=1.0,
+                 burst_rate=10000.0, burst_seconds=1.0, quiet_seconds=4.0, latency=0.0,
+                 jitter=0.0, error_rate=0.0, disconnect_interval=0.0, balance=10000.0,
+                 tokens=(), queue_limit=10000, seed=None):
+        if mode not in TICK_MODES:
+            raise ValueError(f"unknown tick mode: {mode!r}")
+        if mode == "replay" and store is None:
+            raise ValueError("replay mode needs a tick store")
+
+        self.rng = random.Random(seed)
+        self.markets = list(markets)
+        self.mode = mode
+        if mode == "replay":
+            self.sources = {symbol: ReplayTicks(store, symbol) for symbol in self.markets}
+        else:
+            self.sources = {symbol: RandomTicks(symbol, self.rng) for symbol in self.markets}
+
+        self.rate = rate
+        self.burst_rate = burst_rate
+        self.burst_seconds = burst_seconds
+        self.quiet_seconds = quiet_seconds
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.disconnect_interval = disconnect_interval
+        self.queue_limit = queue_limit
+
+        self.initial_balance = balance
+        self.tokens = set(tokens)
+        self.balances = {}
+        self.contract_ids = itertools.count(100000001)
+        self.transaction_ids = itertools.count(500000001)
+        # Open contracts by id; once sold and reported they move to ``sold``,
+        # which keeps the last SOLD_CONTRACTS
+        self.contracts = {}
+        self.sold = OrderedDict()
+        self.open_contracts = defaultdict(list)
+        # Buyable proposal ids: one per subscribed stream (its latest quote)
+        # plus one-off quotes until PROPOSAL_TTL
+        self.proposals = {}
+        self.stream_quotes = {}
+        self.one_off_quotes = deque()
+
+        # (kind, key) -> {(session, subscription_id)}; kind is "ticks",
+        # "proposal" or "proposal_open_contract"
+        self.watchers = defaultdict(set)
+        self.sessions = set()
+        self.stats = defaultdict(int)
+        self.last_quotes = {}
+
+    # Connections
+
+    async def handler(self, ws):
+        session = Session(self, ws)
+        self.sessions.add(session)
+        self.stats['connections'] += 1
+        tasks = [asyncio.ensure_future(session.write_loop())]
+        if self.disconnect_interval:
+            tasks.append(asyncio.ensure_future(self.disconnect_later(session)))
+        try:
+            async for message in ws:
+                self.stats['requests'] += 1
+                self.handle(session, message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            session.forget_all()
+            self.sessions.discard(session)
+
+    async def disconnect_later(self, session):
+        await asyncio.sleep(self.rng.expovariate(1.0 / self.disconnect_interval))
+        self.stats['disconnects'] += 1
+        # Drop the TCP connection without a close frame, like a network fault
+        session.ws.transport.abort()
+
+    def reply(self, session, payload):
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, session.push, payload)
+        else:
+            session.push(payload)
+
+    def handle(self, session, message):
+        try:
+            request = json.loads(message)
+        except ValueError:
+            session.push(error_reply({}, "InputValidationFailed", "Malformed JSON"))
+            return
+        for name, handler in self.handlers():
+            if name in request:
+                payload = handler(session, request)
+                if payload is not None:
+                    self.reply(session, payload)
+                return
+        self.reply(session, error_reply(request, "UnrecognisedRequest", "Unrecognised request"))
+
+    def handlers(self):
+        return (
+            ("authorize", self.on_authorize),
+            ("ticks", self.on_ticks),
+            ("forget_all", self.on_forget_all),
+            ("forget", self.on_forget),
+            ("buy", self.on_buy),
+            ("proposal_open_contract", self.on_open_contract),
+            ("proposal", self.on_proposal),
+            ("portfolio", self.on_portfolio),
+            ("profit_table", self.on_profit_table),
+            ("ping", self.on_ping)
+        )
+
+    def injected_error(self, request):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.stats['injected_errors'] += 1
+            code, message = self.rng.choice(INJECTED_ERRORS)
+            return error_reply(request, code, message)
+        return None
+
+    # Requests
+
+    def on_authorize(self, session, request):
+        token = request["authorize"]
+        if not token or (self.tokens and token not in self.tokens):
+            return error_reply(request, "InvalidToken", "The token is invalid.")
+        session.account = token
+        balance = self.balances.setdefault(token, self.initial_balance)
+        return dict(reply_base(request, "authorize"), authorize={
+            "balance": balance,
+            "currency": "USD",
+            "is_virtual": 1,
+            "loginid": f"VRTC{abs(hash(token)) % 10000000:07d}"
+        })
+
+    def on_ticks(self, session, request):
+        symbol = request["ticks"]
+        if symbol not in self.sources:
+            return error_reply(request, "InvalidSymbol", f"Symbol {symbol} is invalid.")
+        if not request.get("subscribe"):
+            epoch, quote = self.last_quotes.get(symbol) or self.sources[symbol].next()
+            return dict(reply_base(request, "tick"), tick=self.tick_body(symbol, epoch, quote))
+        session.subscribe("ticks", symbol, request)
+        return None
+
+    def on_forget(self, session, request):
+        return dict(reply_base(request, "forget"), forget=int(session.forget(request["forget"])))
+
+    def on_forget_all(self, session, request):
+        kinds = request["forget_all"]
+        kinds = [kinds] if isinstance(kinds, str) else list(kinds)
+        return dict(reply_base(request, "forget_all"), forget_all=session.forget_all(kinds))
+
+    def on_ping(self, session, request):
+        return dict(reply_base(request, "ping"), ping="pong")
+
+    def on_proposal(self, session, request):
+        error = self.injected_error(request)
+        if error is not None:
+            return error
+        symbol = request.get("symbol")
+        if symbol not in self.sources:
+            return error_reply(request, "InvalidSymbol", f"Symbol {symbol} is invalid.")
+        subscription_id = session.subscribe("proposal", symbol, request) if request.get("subscribe") else None
+        return self.proposal_frame(session, request, subscription_id)
+
+    def proposal_frame(self, session, request, subscription_id):
+        # Every quote gets a fresh, single-use proposal id that replaces the
+        # stream's previous one
+        proposal_id = uuid.uuid4().hex
+        amount = float(request.get("amount", 1))
+        self.proposals[proposal_id] = (session.account, request)
+        if subscription_id:
+            self.drop_quote(session, subscription_id)
+            self.stream_quotes[session, subscription_id] = proposal_id
+        else:
+            self.expire_quotes()
+            self.one_off_quotes.append((time.monotonic() + PROPOSAL_TTL, proposal_id))
+        epoch, quote = self.last_quotes.get(request["symbol"], (int(time.time()), None))
+        frame = dict(reply_base(request, "proposal"), proposal={
+            "id": proposal_id,
+            "ask_price": amount,
+            "payout": round(amount * (1 + PAPER_PROFIT_RATIO), 2),
+            "spot": quote,
+            "spot_time": epoch,
+            "longcode": f"Win payout if the last digit of {request['symbol']} is not "
+                        f"{request.get('barrier')} after {CONTRACT_TICKS} ticks."
+        })
+        if subscription_id:
+            frame["subscription"] = {"id": subscription_id}
+        return frame
+
+    def drop_quote(self, session, subscription_id):
+        proposal_id = self.stream_quotes.pop((session, subscription_id), None)
+        if proposal_id is not None:
+            self.proposals.pop(proposal_id, None)
+
+    def expire_quotes(self):
+        now = time.monotonic()
+        quotes = self.one_off_quotes
+        while quotes and quotes[0][0] <= now:
+            self.proposals.pop(quotes.popleft()[1], None)
+
+    def on_buy(self, session, request):
+        if session.account is None:
+            return error_reply(request, "AuthorizationRequired", "Please log in.")
+        error = self.injected_error(request)
+        if error is not None:
+            return error
+
+        if request["buy"] == 1:
+            parameters = request.get("parameters", {})
+        else:
+            account, parameters = self.proposals.pop(request["buy"], (None, None))
+            if parameters is None or account != session.account:
+                return error_reply(request, "InvalidContractProposal", "Unknown contract proposal")
+
+        symbol = parameters.get("symbol")
+        if symbol not in self.sources:
+            return error_reply(request, "InvalidSymbol", f"Symbol {symbol} is invalid.")
+        stake = float(parameters.get("amount", request.get("price", 1)))
+        if stake > float(request.get("price", stake)):
+            return error_reply(request, "PriceMoved", "Contract price exceeds the maximum set.")
+        balance = self.balances[session.account]
+        if stake > balance:
+            return error_reply(request, "InsufficientBalance", "Your account balance is insufficient.")
+
+        self.balances[session.account] = balance - stake
+        self.stats['buys'] += 1
+        contract_id = next(self.contract_ids)
+        contract = {
+            "contract_id": contract_id,
+            "account": session.account,
+            "underlying": symbol,
+            "contract_type": parameters.get("contract_type", "DIGITDIFF"),
+            "barrier": str(parameters.get("barrier")),
+            "buy_price": stake,
+            "payout": round(stake * (1 + PAPER_PROFIT_RATIO), 2),
+            "date_start": int(time.time()),
+            "ticks_left": CONTRACT_TICKS,
+            "tick_count": CONTRACT_TICKS,
+            "is_sold": 0,
+            "status": "open",
+            "profit": 0.0
+        }
+        self.contracts[contract_id] = contract
+        self.open_contracts[symbol].append(contract)
+        return dict(reply_base(request, "buy"), buy={
+            "contract_id": contract_id,
+            "transaction_id": next(self.transaction_ids),
+            "buy_price": stake,
+            "payout": contract["payout"],
+            "balance_after": self.balances[session.account],
+            "start_time": contract["date_start"],
+            "longcode": f"Win payout if the last digit of {symbol} is not {contract['barrier']} "
+                        f"after {CONTRACT_TICKS} ticks."
+        })
+
+    def on_open_contract(self, session, request):
+        contract_id = request.get("contract_id")
+        contract = self.contracts.get(contract_id) or self.sold.get(contract_id)
+        if contract is None or contract["account"] != session.account:
+            return error_reply(request, "ContractNotFound", "Contract not found.")
+        subscription_id = None
+        if request.get("subscribe") and not contract["is_sold"]:
+            subscription_id = session.subscribe("proposal_open_contract", contract["contract_id"], request)
+        return self.contract_frame(contract, request, subscription_id)
+
+    def on_portfolio(self, session, request):
+        if session.account is None:
+            return error_reply(request, "AuthorizationRequired", "Please log in.")
+        contracts = [{
+            "contract_id": contract["contract_id"],
+            "contract_type": contract["contract_type"],
+            "symbol": contract["underlying"],
+            "buy_price": contract["buy_price"],
+            "payout": contract["payout"],
+            "purchase_time": contract["date_start"],
+            "currency": "USD"
+        } for contract in self.contracts.values() if contract["account"] == session.account]
+        return dict(reply_base(request, "portfolio"), portfolio={"contracts": contracts})
+
+    def on_profit_table(self, session, request):
+        if session.account is None:
+            return error_reply(request, "AuthorizationRequired", "Please log in.")
+        since = int(request.get("date_from", 0))
+        sold = [contract for contract in self.sold.values()
+                if contract["account"] == session.account and contract["date_start"] >= since]
+        sold.sort(key=lambda contract: contract["contract_id"],
+                  reverse=request.get("sort", "DESC") == "DESC")
+        transactions = [{
+            "contract_id": contract["contract_id"],
+            "buy_price": contract["buy_price"],
+            "sell_price": round(contract["buy_price"] + contract["profit"], 2),
+            "purchase_time": contract["date_start"],
+            "sell_time": contract["sell_time"],
+            "shortcode": f"{contract['contract_type']}_{contract['underlying']}_"
+                         f"{contract['payout']}_{contract['date_start']}_{CONTRACT_TICKS}T_"
+                         f"{contract['barrier']}_0"
+        } for contract in sold[:int(request.get("limit", 50))]]
+        return dict(reply_base(request, "profit_table"), profit_table={
+            "count": len(transactions), "transactions": transactions})
+
+    def contract_frame(self, contract, request, subscription_id):
+        body = {key: value for key, value in contract.items() if key not in ("account", "ticks_left")}
+        frame = dict(reply_base(request, "proposal_open_contract"), proposal_open_contract=body)
+        if subscription_id:
+            frame["subscription"] = {"id": subscription_id}
+        return frame
+
+    # Tick stream
+
+    def current_rate(self, elapsed):
+        if self.mode != "bursty":
+            return self.rate
+        cycle = self.burst_seconds + self.quiet_seconds
+        return self.burst_rate if elapsed % cycle < self.burst_seconds else self.rate
+
+    async def tick_loop(self):
+        loop = asyncio.get_running_loop()
+        started = last = loop.time()
+        due = 0.0
+        while True:
+            now = loop.time()
+            rate = self.current_rate(now - started)
+            due += rate * (now - last)
+            last = now
+            count = int(due)
+            due -= count
+            for _ in range(count):
+                for symbol, source in self.sources.items():
+                    self.publish(symbol, *source.next())
+            await asyncio.sleep(max(0.001, min(MAX_TICK_SLEEP, 1.0 / rate if rate else MAX_TICK_SLEEP)))
+
+    def tick_body(self, symbol, epoch, quote):
+        pip_size = self.sources[symbol].pip_size
+        return {"ask": quote, "bid": quote, "epoch": epoch, "id": symbol,
+                "pip_size": pip_size, "quote": quote, "symbol": symbol}
+
+    def publish(self, symbol, epoch, quote):
+        self.stats['ticks'] += 1
+        self.last_quotes[symbol] = (epoch, quote)
+
+        body = self.tick_body(symbol, epoch, quote)
+        for session, subscription_id in list(self.watchers["ticks", symbol]):
+            request = session.subscriptions[subscription_id][2]
+            frame = dict(reply_base(request, "tick"), subscription={"id": subscription_id}, tick=body)
+            session.push_tick(json.dumps(frame, separators=(',', ':')))
+
+        if self.open_contracts[symbol]:
+            self.settle(symbol, last_digit(quote, self.sources[symbol].pip_size), quote)
+
+        for session, subscription_id in list(self.watchers["proposal", symbol]):
+            request = session.subscriptions[subscription_id][2]
+            session.push(self.proposal_frame(session, request, subscription_id))
+
+    def settle(self, symbol, digit, quote):
+        still_open = []
+        for contract in self.open_contracts[symbol]:
+            contract["ticks_left"] -= 1
+            contract["current_spot"] = quote
+            if contract["ticks_left"] > 0:
+                still_open.append(contract)
+            else:
+                won = str(digit) != contract["barrier"]
+                contract["is_sold"] = 1
+                contract["status"] = "won" if won else "lost"
+                contract["exit_tick"] = quote
+                contract["sell_time"] = int(time.time())
+                contract["profit"] = round(contract["payout"] - contract["buy_price"], 2) if won \
+                    else -contract["buy_price"]
+                if won:
+                    self.balances[contract["account"]] += contract["payout"]
+                self.stats['settled'] += 1
+            self.notify(contract)
+            if contract["is_sold"]:
+                self.retire(contract)
+        self.open_contracts[symbol] = still_open
+
+    def retire(self, contract):
+        # Its final update has gone out; later lookups come from ``sold``
+        contract_id = contract["contract_id"]
+        del self.contracts[contract_id]
+        self.sold[contract_id] = contract
+        if len(self.sold) > SOLD_CONTRACTS:
+            self.sold.popitem(last=False)
+
+    def notify(self, contract):
+        key = ("proposal_open_contract", contract["contract_id"])
+        for session, subscription_id in list(self.watchers[key]):
+            request = session.subscriptions[subscription_id][2]
+            session.push(self.contract_frame(contract, request, subscription_id))
+            if contract["is_sold"]:
+                session.forget(subscription_id)
+
+    # Running
+
+    async def report_loop(self, interval):
+        previous = dict(self.stats)
+        while True:
+            await asyncio.sleep(interval)
+            current = dict(self.stats)
+            rate = (current.get('ticks', 0) - previous.get('ticks', 0)) / interval
+            print(f"ticks/s {rate:,.0f}  sessions {len(self.sessions)}  "
+                  f"buys {current.get('buys', 0)}  settled {current.get('settled', 0)}  "
+                  f"dropped {current.get('dropped', 0)}  errors {current.get('injected_errors', 0)}  "
+                  f"disconnects {current.get('disconnects', 0)}", flush=True)
+            previous = current
+
+    async def serve(self, host="127.0.0.1", port=8765, stats_interval=None):
+        async with websockets.serve(self.handler, host, port, ping_interval=None, max_queue=None):
+            tasks = [asyncio.ensure_future(self.tick_loop())]
+            if stats_interval:
+                tasks.append(asyncio.ensure_future(self.report_loop(stats_interval)))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Deriv API simulator")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=TICK_MODES, default="random")
+    parser.add_argument('--ticks', help="tick store directory for replay mode")
+    parser.add_argument('--markets', nargs='+')
+    parser.add_argument('--rate', type=float, default=1.0, help="ticks per second per market")
+    parser.add_argument('--burst-rate', type=float, default=10000.0)
+    parser.add_argument('--burst-seconds', type=float, default=1.0)
+    parser.add_argument('--quiet-seconds', type=float, default=4.0)
+    parser.add_argument('--latency', type=float, default=0.0, help="reply delay in seconds")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random reply delay, up to")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of buys/proposals failed")
+    parser.add_argument('--disconnect-interval', type=float, default=0.0,
+                        help="mean seconds between dropped connections (0 = never)")
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--tokens', nargs='+', default=(), help="accepted tokens (default: any)")
+    parser.add_argument('--queue-limit', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--stats-interval', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    store = None
+    markets = args.markets or DEFAULT_MARKETS
+    if args.mode == "replay":
+        if not args.ticks:
+            parser.error("--mode replay needs --ticks")
+        from tickstore import TickStore
+        store = TickStore(args.ticks)
+        markets = args.markets or store.markets()
+
+    simulator = Simulator(markets, args.mode, store, args.rate, args.burst_rate,
+                          args.burst_seconds, args.quiet_seconds, args.latency, args.jitter,
+                          args.error_rate, args.disconnect_interval, args.balance, args.tokens,
+                          args.queue_limit, args.seed)
+    print(f"Serving on ws://{args.host}:{args.port} ({args.mode} ticks)", flush=True)
+    try:
+        asyncio.run(simulator.serve(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Parallel parameter sweeps over recorded ticks.
+
+Each grid cell is evaluated in a process pool. Workers memory-map the tick
+store themselves (nothing but the cell parameters is pickled), and results
+stream into one SQLite table written only by the parent, so an interrupted
+sweep picks up where it stopped:
+
+    python sweep.py ticks/ sweep.db --grid rarity_window=10,20,50 \\
+        --grid rarest_count=1,2,3 --grid pattern_length=3,5,7
+
+Cells that only vary per-market parameters go through the vectorized
+evaluator; cells with ``market_switch_interval``, ``exploration`` or
+``allocation`` need cross-market replay and run through ``backtest.Backtest`` instead.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+
+from tickstore import TickStore
+
+ENGINE_PARAMS = ('market_switch_interval', 'exploration', 'allocation')
+DEFAULTS = {
+    'rarity_window': 20,
+    'rarest_count': 2,
+    'pattern_length': 5,
+    'pattern_confirm': 3,
+    'stake': 1.0,
+    'market_switch_interval': 5,
+    'exploration': 0.1
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    cell TEXT NOT NULL,
+    market TEXT NOT NULL,
+    params TEXT NOT NULL,
+    trades INTEGER,
+    wins INTEGER,
+    losses INTEGER,
+    win_rate REAL,
+    profit_loss REAL,
+    max_drawdown REAL,
+    seconds REAL,
+    PRIMARY KEY (cell, market)
+)
+"""
+
+ALL_MARKETS = 'ALL'
+
+# Per-worker state, set up once by init_worker
+worker = {}
+
+
+def cell_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def expand_grid(grid):
+    names = sorted(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(DEFAULTS)
+        params.update(zip(names, values))
+        yield params
+
+
+def init_worker(root, symbols, use_engine, seed):
+    worker['store'] = TickStore(root)
+    worker['symbols'] = symbols or worker['store'].markets()
+    worker['use_engine'] = use_engine
+    worker['seed'] = seed
+    worker['cache'] = {}
+
+
+def market_arrays(symbol):
+    # Digits plus the parameter-independent outcome arrays, built from the
+    # worker's own mapping of the segment files
+    cache = worker['cache']
+    if symbol not in cache:
+        import numpy as np
+        import vectorized
+        store = worker['store']
+        parts = [segment.array()['digit'][start:stop]
+                 for segment, start, stop in store.slices(symbol)]
+        digits = np.concatenate(parts) if parts else np.zeros(0, dtype=np.uint8)
+        cache[symbol] = {'digits': digits, 'outcomes': vectorized.outcomes(digits),
+                         'ranks': {}, 'patterns': {}}
+    return cache[symbol]
+
+
+def evaluate_vectorized(params):
+    import numpy as np
+    import vectorized
+
+    rows = []
+    for symbol in worker['symbols']:
+        arrays = market_arrays(symbol)
+        digits = arrays['digits']
+        window = params['rarity_window']
+        if window not in arrays['ranks']:
+            arrays['ranks'][window] = vectorized.rarest_rank(digits, window)
+        pattern_key = (params['pattern_length'], params['pattern_confirm'])
+        if pattern_key not in arrays['patterns']:
+            arrays['patterns'][pattern_key] = vectorized.pattern_signal(digits, *pattern_key)
+
+        filled = np.arange(len(digits)) + 1 >= window
+        signals = filled & (arrays['ranks'][window] < params['rarest_count']) & arrays['patterns'][pattern_key]
+        settles, wins = arrays['outcomes']
+        rows.append((symbol, vectorized.settle(signals, settles, wins, params['stake'])))
+
+    # Market results are independent here, so totals simply add up
+    total = {key: sum(result[key] for _, result in rows)
+             for key in ('trades', 'wins', 'losses', 'profit_loss')}
+    settled = total['wins'] + total['losses']
+    total['win_rate'] = total['wins'] / settled * 100 if settled else 0
+    total['max_drawdown'] = None
+    rows.append((ALL_MARKETS, total))
+    return rows
+
+
+def evaluate_engine(params):
+    from backtest import Backtest
+
+    backtest = Backtest(worker['store'], worker['symbols'], seed=worker['seed'], **params)
+    result = backtest.run()
+
+    rows = []
+    for market, perf in result['markets'].items():
+        settled = perf['wins'] + perf['losses']
+        rows.append((market, {
+            'trades': settled,
+            'wins': perf['wins'],
+            'losses': perf['losses'],
+            'win_rate': perf['wins'] / settled * 100 if settled else 0,
+            'profit_loss': perf['profit'],
+            'max_drawdown': None
+        }))
+    rows.append((ALL_MARKETS, result))
+    return rows
+
+
+def run_cell(params):
+    started = time.perf_counter()
+    if worker['use_engine']:
+        rows = evaluate_engine(params)
+    else:
+        rows = evaluate_vectorized(params)
+    return params, rows, time.perf_counter() - started
+
+
+class SweepTable:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+        self.db.commit()
+
+    def finished(self):
+        return {row[0] for row in self.db.execute(
+            "SELECT cell FROM results WHERE market = ?", (ALL_MARKETS,))}
+
+    def write(self, params, rows, seconds):
+        key = cell_key(params)
+        # The ALL row goes last, so a cell only counts as finished once
+        # every market row for it is stored
+        self.db.executemany(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(key, market, key, result['trades'], result['wins'], result['losses'],
+              result['win_rate'], result['profit_loss'], result['max_drawdown'], seconds)
+             for market, result in rows]
+        )
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def run_sweep(root, output, grid, symbols=None, processes=None, seed=None,
+              commit_every=50, progress=None):
+    use_engine = any(name in ENGINE_PARAMS for name in grid)
+    table = SweepTable(output)
+    done = table.finished()
+    cells = [params for params in expand_grid(grid) if cell_key(params) not in done]
+    total = len(cells) + len(done)
+
+    processes = processes or os.cpu_count() or 1
+    completed = len(done)
+    try:
+        with multiprocessing.Pool(processes, init_worker, (root, symbols, use_engine, seed)) as pool:
+            for params, rows, seconds in pool.imap_unordered(run_cell, cells, chunksize=1):
+                table.write(params, rows, seconds)
+                completed += 1
+                if completed % commit_every == 0:
+                    table.commit()
+                if progress:
+                    progress(completed, total)
+    finally:
+        table.close()
+    return completed - len(done)
+
+
+def convert(name, value):
+    if name == 'allocation':
+        return value
+    return float(value) if name in ('stake', 'exploration') else int(value)
+
+
+def parse_grid(specs):
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if name not in DEFAULTS and name not in ENGINE_PARAMS:
+            raise SystemExit(f"unknown parameter: {name}")
+        grid[name] = [convert(name, v) for v in values.split(',') if v]
+    return grid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over recorded ticks")
+    parser.add_argument('data', help="tick store directory")
+    parser.add_argument('output', help="SQLite results file (resumed if it exists)")
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...')
+    parser.add_argument('--markets', nargs='+')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--seed', type=int, help="seed for engine-mode market selection")
+    args = parser.parse_args(argv)
+
+    def progress(completed, total):
+        print(f"\r{completed}/{total} cells", end='', flush=True)
+
+    started = time.perf_counter()
+    count = run_sweep(args.data, args.output, parse_grid(args.grid), args.markets,
+                      args.processes, args.seed, progress=progress)
+    print(f"\nEvaluated {count} cells in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
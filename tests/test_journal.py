@@ -0,0 +1,111 @@
+"""Session journal: replay, snapshots and recovery into a fresh engine."""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import DifferEngine
+from journal import JOURNAL_FILE, Journal
+from risk import RiskEngine
+
+
+def paper_engine():
+    # No cooldown: it runs on the wall clock (see test_risk for that)
+    risk = RiskEngine(daily_loss=10000.0)
+    return DifferEngine(paper=True, max_trades=10 ** 6, risk=risk)
+
+
+def trade(engine, ticks, seed=1):
+    rng = random.Random(seed)
+    for index in range(ticks):
+        engine.on_tick(rng.randrange(10), engine.available_markets[index % 5])
+
+
+def session(directory, ticks=20000, stop=False, **options):
+    engine = paper_engine()
+    journal = Journal(directory, fsync=False, **options)
+    journal.recover(engine)
+    journal.attach(engine)
+    engine.set_connected(True)
+    engine.start()
+    engine.set_balance(1000.0)
+    trade(engine, ticks)
+    if stop:
+        engine.stop()
+    journal.close()
+    return engine
+
+
+def recover(directory):
+    engine = paper_engine()
+    return engine, Journal(directory, fsync=False).recover(engine)
+
+
+def accounting(engine):
+    state = engine.export_state()
+    # Replayed times are the records' own, a moment after the engine's
+    for key in ('closed', 'start_time'):
+        state.pop(key)
+    for trade in state['history']:
+        trade.pop('time')
+    return state
+
+
+@pytest.mark.parametrize("snapshot_interval", (10, 1000))
+def test_recovery_restores_killed_session(tmp_path, snapshot_interval):
+    before = session(tmp_path, snapshot_interval=snapshot_interval)
+    assert before.trade_count > 0
+
+    after, recovery = recover(tmp_path)
+    assert recovery['active']
+    assert recovery['paper'] is True
+    assert recovery['trades'] == before.trade_count
+    assert recovery['pending'] == len(before.pending_contracts)
+    assert accounting(after) == accounting(before)
+    assert after.reserved == pytest.approx(before.reserved)
+    assert after.risk.open_count == before.risk.open_count
+
+
+def test_risk_day_state_survives_recovery(tmp_path):
+    before = session(tmp_path, snapshot_interval=25)
+    after, _ = recover(tmp_path)
+    assert after.risk.export_state() == before.risk.export_state()
+    assert after.risk.daily_pnl == pytest.approx(before.profit_loss)
+
+
+def test_stopped_session_is_not_resumed(tmp_path):
+    before = session(tmp_path, stop=True)
+    after, recovery = recover(tmp_path)
+    assert not recovery['active']
+    assert recovery['trades'] == before.trade_count
+
+
+def test_fresh_start_after_stop_is_active_again(tmp_path):
+    session(tmp_path, stop=True)
+    session(tmp_path, ticks=5000)
+    _, recovery = recover(tmp_path)
+    assert recovery['active']
+
+
+def test_resume_refuses_a_different_mode(tmp_path):
+    session(tmp_path)
+    engine, _ = recover(tmp_path)
+    engine.set_paper(False)
+    with pytest.raises(ValueError):
+        engine.start(resume=True)
+    engine.set_paper(True)
+    engine.start(resume=True)
+    assert engine.running
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    before = session(tmp_path, ticks=3000)
+    with open(os.path.join(tmp_path, JOURNAL_FILE), 'ab') as handle:
+        handle.write(b'{"seq":999999,"t":0,"type":"sett')
+    after, recovery = recover(tmp_path)
+    assert recovery['trades'] == before.trade_count
+    assert after.profit_loss == pytest.approx(before.profit_loss)
@@ -0,0 +1,162 @@
+"""Buys whose reply was lost in a disconnect, reconciled after authorize."""
+
+import os
+import sys
+from collections import defaultdict
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import DifferEngine
+from session import AccountSession
+
+LOST = {"error": {"code": "Disconnected", "message": "Connection lost before reply"}}
+
+
+class FakeClient:
+    # Just enough of DerivClient for AccountSession
+    def __init__(self):
+        self.listeners = defaultdict(list)
+        self.tracked = []
+        self.fetches = []
+
+    def on(self, event, callback):
+        self.listeners[event].append(callback)
+
+    def emit(self, event, *args):
+        for callback in self.listeners[event]:
+            callback(*args)
+
+    def track_contract(self, contract_id, callback):
+        self.tracked.append(contract_id)
+
+    def fetch_contracts(self, since, callback):
+        self.fetches.append((since, callback))
+
+
+class FakePipeline:
+    def __init__(self):
+        self.orders = []
+
+    def buy(self, contract, order, callback):
+        self.orders.append((order, callback))
+
+
+def live_engine(session, market="R_10", balance=None):
+    engine = DifferEngine(markets=(market,))
+    pipeline = FakePipeline()
+    session.add(engine, pipeline, balance)
+    engine.set_balance(100.0)
+    engine.set_connected(True)
+    engine.start()
+    return engine, pipeline
+
+
+def lose_orders(engine, pipeline, count):
+    for barrier in range(count):
+        engine.execute_trade(barrier)
+    for order, callback in pipeline.orders[-count:]:
+        callback(dict(LOST))
+
+
+def portfolio_entry(contract_id, symbol="R_10", stake=1.0):
+    return {"contract_id": contract_id, "contract_type": "DIGITDIFF", "symbol": symbol,
+            "buy_price": stake}
+
+
+def sold_entry(contract_id, symbol="R_10", stake=1.0):
+    return {"contract_id": contract_id, "buy_price": stake, "sell_price": 0,
+            "shortcode": f"DIGITDIFF_{symbol}_1.95_1700000000_5T_3_0"}
+
+
+def test_lost_orders_keep_their_stake_committed():
+    session = AccountSession(FakeClient())
+    engine, pipeline = live_engine(session)
+    lose_orders(engine, pipeline, 2)
+    assert len(engine.unknown) == 2
+    assert engine.trade_count == 2
+    assert engine.reserved == 2.0
+    assert engine.risk.open_count == 2
+    assert engine.export_state()['trade_count'] == 0
+
+
+def test_authorize_fetches_and_reconcile_adopts_and_releases():
+    client = FakeClient()
+    session = AccountSession(client)
+    engine, pipeline = live_engine(session)
+    lose_orders(engine, pipeline, 3)
+
+    # The broker took the stakes of the two that were filled
+    client.emit("authorize", {"balance": 98.0})
+    assert len(client.fetches) == 1
+    since, callback = client.fetches[0]
+    assert since == engine.unknown_since()
+
+    callback([portfolio_entry(7), portfolio_entry(8, symbol="R_25")], [sold_entry(9)])
+    assert set(engine.pending_contracts) == {7, 9}
+    assert client.tracked == [7, 9]
+    assert not engine.unknown
+    assert engine.trade_count == 2
+    assert engine.reserved == 2.0
+    assert engine.risk.open_count == 2
+    assert engine.balance == 100.0
+
+    engine.on_contract_update({"contract_id": 9, "is_sold": 1, "profit": -1.0})
+    assert engine.balance == 99.0
+    assert engine.reserved == 1.0
+
+
+def test_known_contracts_are_not_adopted():
+    client = FakeClient()
+    session = AccountSession(client)
+    engine, pipeline = live_engine(session)
+    engine.execute_trade(1)
+    order, reply = pipeline.orders[-1]
+    reply({"buy": {"contract_id": 5}})
+    lose_orders(engine, pipeline, 1)
+
+    client.emit("authorize", {"balance": 98.0})
+    client.fetches[0][1]([portfolio_entry(5)], [])
+    assert set(engine.pending_contracts) == {5}
+    assert engine.trade_count == 1
+    assert engine.reserved == 1.0
+
+
+def test_engines_on_one_account_never_share_a_contract():
+    client = FakeClient()
+    session = AccountSession(client)
+    first, first_pipeline = live_engine(session)
+    second, second_pipeline = live_engine(session)
+
+    # The first engine's contract went through; the second lost its reply
+    first.execute_trade(1)
+    order, reply = first_pipeline.orders[-1]
+    reply({"buy": {"contract_id": 5}})
+    lose_orders(second, second_pipeline, 1)
+
+    client.emit("authorize", {"balance": 198.0})
+    client.fetches[0][1]([portfolio_entry(5)], [])
+    assert set(first.pending_contracts) == {5}
+    assert not second.pending_contracts
+    assert second.trade_count == 0
+    assert second.reserved == 0.0
+
+
+def test_authorize_adds_open_stakes_back_to_the_account_balance():
+    client = FakeClient()
+    session = AccountSession(client)
+    engine, pipeline = live_engine(session)
+    engine.execute_trade(1)
+    order, reply = pipeline.orders[-1]
+    reply({"buy": {"contract_id": 5}})
+
+    client.emit("authorize", {"balance": 99.0})
+    assert engine.balance == 100.0
+    assert engine.balance - engine.reserved == 99.0
+    # Streamed when acknowledged and again on the new socket
+    assert client.tracked == [5, 5]
+    assert not client.fetches
+
+    engine.on_contract_update({"contract_id": 5, "is_sold": 1, "profit": 0.95})
+    assert engine.balance == pytest.approx(100.95)
@@ -0,0 +1,115 @@
+"""RiskEngine limits, driven by an injected clock."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import DifferEngine
+from risk import DAY, RiskEngine
+
+
+class Clock:
+    def __init__(self, now=10 * DAY + 3600.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_unset_limits_allow_everything():
+    risk = RiskEngine(clock=Clock())
+    for _ in range(100):
+        assert risk.check("R_10", 5.0) is None
+        risk.opened("R_10", 5.0)
+
+
+def test_max_open_and_exposure_count_open_stakes():
+    risk = RiskEngine(max_open=2, max_exposure=3.0, clock=Clock())
+    risk.opened("R_10", 1.0)
+    assert risk.check("R_10", 1.0) is None
+    risk.opened("R_25", 1.0)
+    assert risk.check("R_10", 1.0) == "max_open"
+
+    risk.cancelled("R_25", 1.0)
+    assert risk.check("R_10", 2.0) is None
+    assert risk.check("R_10", 2.5) == "max_exposure"
+
+
+def test_daily_loss_counts_open_stakes_and_rolls_over_at_midnight():
+    clock = Clock()
+    risk = RiskEngine(daily_loss=5.0, clock=clock)
+    for _ in range(3):
+        risk.opened("R_10", 1.0)
+        risk.closed("R_10", 1.0, -1.0)
+    risk.opened("R_10", 1.0)
+    assert risk.check("R_25", 1.0) is None
+    assert risk.check("R_25", 1.5) == "daily_loss"
+
+    clock.now += DAY
+    assert risk.check("R_25", 1.5) is None
+    assert risk.daily_pnl == 0.0
+
+
+def test_market_loss_is_per_market():
+    risk = RiskEngine(market_loss=2.0, clock=Clock())
+    risk.opened("R_10", 1.0)
+    risk.closed("R_10", 1.0, -1.5)
+    assert risk.check("R_10", 1.0) == "market_loss"
+    assert risk.check("R_25", 1.0) is None
+
+
+def test_loss_streak_starts_a_cooldown():
+    clock = Clock()
+    risk = RiskEngine(max_consecutive_losses=3, cooldown=60.0, clock=clock)
+    for profit in (-1.0, -1.0, 0.95, -1.0, -1.0):
+        risk.opened("R_10", 1.0)
+        risk.closed("R_10", 1.0, profit)
+    assert risk.check("R_10", 1.0) is None
+
+    risk.opened("R_10", 1.0)
+    risk.closed("R_10", 1.0, -1.0)
+    assert risk.check("R_10", 1.0) == "cooldown"
+    assert risk.summary()['cooldown'] == 60.0
+
+    clock.now += 60.0
+    assert risk.check("R_10", 1.0) is None
+
+
+def test_state_round_trip_keeps_cooldown_and_drops_a_past_day():
+    clock = Clock()
+    risk = RiskEngine(max_consecutive_losses=1, cooldown=60.0, clock=clock)
+    risk.opened("R_10", 1.0)
+    risk.closed("R_10", 1.0, -1.0)
+
+    restored = RiskEngine(max_consecutive_losses=1, cooldown=60.0, clock=clock)
+    restored.restore_state(risk.export_state())
+    assert restored.check("R_10", 1.0) == "cooldown"
+    assert restored.daily_pnl == -1.0
+
+    clock.now += DAY
+    later = RiskEngine(clock=clock)
+    later.restore_state(risk.export_state())
+    assert later.daily_pnl == 0.0
+    assert not later.market_pnl
+
+
+def test_engine_rejects_orders_the_risk_engine_refuses():
+    engine = DifferEngine(markets=("R_10",), risk=RiskEngine(max_open=1, clock=Clock()))
+    orders = []
+    rejects = []
+    engine.subscribe("order", lambda contract, order: orders.append(order))
+    engine.subscribe("reject", lambda order, reason: rejects.append(reason))
+    engine.set_balance(100.0)
+    engine.set_connected(True)
+    engine.start()
+
+    engine.execute_trade(1)
+    engine.execute_trade(2)
+    assert len(orders) == 1
+    assert rejects == ["max_open"]
+    assert engine.risk.rejections["max_open"] == 1
+
+    engine.on_buy({"error": {"code": "RateLimit", "message": "Slow down"}}, orders[0])
+    engine.execute_trade(3)
+    assert len(orders) == 2
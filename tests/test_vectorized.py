@@ -0,0 +1,82 @@
+"""vectorized.evaluate must trade exactly like a streaming paper engine."""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vectorized
+from engine import DifferEngine
+
+TICKS = 20000
+
+PARAMS = (
+    dict(rarity_window=20, rarest_count=2, pattern_length=5, pattern_confirm=3),
+    dict(rarity_window=10, rarest_count=1, pattern_length=3, pattern_confirm=1),
+    dict(rarity_window=50, rarest_count=3, pattern_length=4, pattern_confirm=5),
+    dict(rarity_window=100, rarest_count=4, pattern_length=6, pattern_confirm=10),
+)
+
+
+def random_digits(seed):
+    return np.random.default_rng(seed).integers(0, 10, TICKS, dtype=np.uint8)
+
+
+def skewed_digits(seed):
+    # A few digits dominate and long runs repeat, so streaks and ties in
+    # the rarest digits come up far more often than in a uniform stream
+    rng = np.random.default_rng(seed)
+    weights = np.array([8, 1, 1, 6, 1, 1, 1, 4, 1, 1], dtype=float)
+    digits = rng.choice(10, TICKS, p=weights / weights.sum()).astype(np.uint8)
+    runs = rng.integers(0, TICKS - 8, TICKS // 200)
+    for start in runs:
+        digits[start:start + 8] = digits[start]
+    return digits
+
+
+def stream(digits, **params):
+    engine = DifferEngine(markets=("R_10",), paper=True, max_trades=len(digits), **params)
+    engine.set_connected(True)
+    engine.start()
+    engine.set_balance(len(digits) * 10.0)
+
+    traded = []
+    tick = [0]
+    engine.subscribe("contract", lambda contract_id, info: traded.append(tick[0]))
+    for index, digit in enumerate(digits.tolist()):
+        tick[0] = index
+        engine.on_tick(digit, "R_10")
+    return engine, traded
+
+
+@pytest.mark.parametrize("params", PARAMS)
+@pytest.mark.parametrize("make_digits", (random_digits, skewed_digits))
+@pytest.mark.parametrize("seed", (1, 2))
+def test_evaluate_matches_engine(make_digits, seed, params):
+    digits = make_digits(seed)
+    engine, traded = stream(digits, **params)
+
+    signals = vectorized.trade_signals(digits, **params)
+    assert np.flatnonzero(signals).tolist() == traded
+
+    result = vectorized.evaluate(digits, **params)
+    assert result['trades'] == engine.trade_count
+    assert result['open'] == len(engine.pending_contracts)
+    assert result['wins'] == engine.wins
+    assert result['losses'] == engine.losses
+    assert result['profit_loss'] == engine.profit_loss
+
+
+def test_sweep_rows_match_evaluate():
+    digits = skewed_digits(3)
+    rows = vectorized.sweep(digits, rarity_windows=(10, 20), rarest_counts=(1, 2),
+                            pattern_lengths=(4, 5), pattern_confirms=(1, 3))
+    assert len(rows) == 16
+    for row in rows:
+        params = {key: row[key] for key in
+                  ('rarity_window', 'rarest_count', 'pattern_length', 'pattern_confirm')}
+        assert vectorized.evaluate(digits, **params) == {
+            key: value for key, value in row.items() if key not in params}
@@ -0,0 +1,216 @@
+"""Append-only binary tick files, one directory per market.
+
+Each tick is a fixed 16-byte little-endian record::
+
+    epoch      uint32   tick time (unix seconds)
+    quote      float64  price as sent by the API
+    digit      uint8    derived last digit
+    pip_size   uint8    decimals used to derive the digit
+    (2 bytes padding)
+
+Segments are named after the epoch of their first tick
+(``<root>/<symbol>/<epoch>.ticks``) and rotate every ``segment_ticks``
+records, so a directory listing is already in time order. Readers memory-map
+segments and slice them without decoding anything they do not need.
+"""
+
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import time
+
+RECORD = struct.Struct('<IdBBxx')
+RECORD_SIZE = RECORD.size
+EPOCH = struct.Struct('<I')
+DIGIT_OFFSET = 12
+SEGMENT_SUFFIX = '.ticks'
+
+
+class TickRecorder:
+    def __init__(self, root, segment_ticks=1000000, fsync_interval=5.0):
+        self.root = root
+        self.segment_ticks = segment_ticks
+        self.fsync_interval = fsync_interval
+        self.files = {}
+        self.counts = {}
+        self.last_sync = time.monotonic()
+
+    def record(self, symbol, epoch, quote, digit, pip_size=0):
+        handle = self.files.get(symbol)
+        if handle is None or self.counts[symbol] >= self.segment_ticks:
+            handle = self.rotate(symbol, epoch)
+
+        handle.write(RECORD.pack(epoch, quote, digit, pip_size))
+        self.counts[symbol] += 1
+
+        now = time.monotonic()
+        if now - self.last_sync >= self.fsync_interval:
+            self.sync()
+            self.last_sync = now
+
+    def rotate(self, symbol, epoch):
+        old = self.files.pop(symbol, None)
+        if old is not None:
+            self.sync_file(old)
+            old.close()
+
+        directory = os.path.join(self.root, symbol)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{epoch:010d}{SEGMENT_SUFFIX}")
+        handle = open(path, 'ab', buffering=64 * 1024)
+
+        # A restart may reopen a segment cut short by a crash; drop any
+        # trailing partial record so the file stays record-aligned
+        size = handle.tell()
+        if size % RECORD_SIZE:
+            handle.truncate(size - size % RECORD_SIZE)
+            handle.seek(0, os.SEEK_END)
+
+        self.files[symbol] = handle
+        self.counts[symbol] = handle.tell() // RECORD_SIZE
+        return handle
+
+    def sync_file(self, handle):
+        handle.flush()
+        os.fsync(handle.fileno())
+
+    def sync(self):
+        for handle in self.files.values():
+            self.sync_file(handle)
+
+    def close(self):
+        for handle in self.files.values():
+            self.sync_file(handle)
+            handle.close()
+        self.files.clear()
+        self.counts.clear()
+
+
+class TickSegment:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as handle:
+            size = os.fstat(handle.fileno()).st_size
+            self.count = size // RECORD_SIZE
+            if self.count:
+                self.buffer = mmap.mmap(handle.fileno(), self.count * RECORD_SIZE,
+                                        access=mmap.ACCESS_READ)
+            else:
+                self.buffer = b''
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        return RECORD.unpack_from(self.buffer, index * RECORD_SIZE)
+
+    def epoch(self, index):
+        return EPOCH.unpack_from(self.buffer, index * RECORD_SIZE)[0]
+
+    def search(self, epoch):
+        # First index whose epoch is >= ``epoch``
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.epoch(mid) < epoch:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def digits(self, start=0, stop=None):
+        # Strided slice straight out of the mapping: one byte per tick
+        stop = self.count if stop is None else stop
+        return self.buffer[start * RECORD_SIZE + DIGIT_OFFSET:stop * RECORD_SIZE:RECORD_SIZE]
+
+    def ticks(self, start=0, stop=None):
+        stop = self.count if stop is None else stop
+        for epoch, quote, digit, pip_size in RECORD.iter_unpack(
+                self.buffer[start * RECORD_SIZE:stop * RECORD_SIZE]):
+            yield epoch, quote, digit
+
+    def array(self):
+        # Zero-copy structured view; needs numpy
+        import numpy as np
+        dtype = np.dtype([('epoch', '<u4'), ('quote', '<f8'), ('digit', 'u1'),
+                          ('pip_size', 'u1'), ('pad', 'V2')])
+        return np.frombuffer(self.buffer, dtype=dtype, count=self.count)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+class TickStore:
+    def __init__(self, root):
+        self.root = root
+        self.open_segments = {}
+
+    def markets(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name)))
+
+    def segment_paths(self, symbol):
+        directory = os.path.join(self.root, symbol)
+        if not os.path.isdir(directory):
+            return []
+        return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                if name.endswith(SEGMENT_SUFFIX)]
+
+    def segments(self, symbol):
+        segments = []
+        for path in self.segment_paths(symbol):
+            segment = self.open_segments.get(path)
+            # Re-map segments that grew since they were opened
+            if segment is None or os.path.getsize(path) // RECORD_SIZE > segment.count:
+                if segment is not None:
+                    segment.close()
+                segment = self.open_segments[path] = TickSegment(path)
+            segments.append(segment)
+        return segments
+
+    def slices(self, symbol, start_epoch=None, end_epoch=None):
+        # (segment, start, stop) ranges covering [start_epoch, end_epoch)
+        segments = self.segments(symbol)
+        firsts = [int(os.path.basename(s.path)[:-len(SEGMENT_SUFFIX)]) for s in segments]
+        first = 0
+        if start_epoch is not None:
+            first = max(bisect.bisect_right(firsts, start_epoch) - 1, 0)
+        for segment, segment_start in zip(segments[first:], firsts[first:]):
+            if end_epoch is not None and segment_start >= end_epoch:
+                break
+            start = segment.search(start_epoch) if start_epoch is not None else 0
+            stop = segment.search(end_epoch) if end_epoch is not None else len(segment)
+            if start < stop:
+                yield segment, start, stop
+
+    def digits(self, symbol, start_epoch=None, end_epoch=None):
+        return b''.join(segment.digits(start, stop) for segment, start, stop
+                        in self.slices(symbol, start_epoch, end_epoch))
+
+    def ticks(self, symbol, start_epoch=None, end_epoch=None):
+        for segment, start, stop in self.slices(symbol, start_epoch, end_epoch):
+            yield from segment.ticks(start, stop)
+
+    def tagged(self, symbol, start_epoch=None, end_epoch=None):
+        for epoch, quote, digit in self.ticks(symbol, start_epoch, end_epoch):
+            yield epoch, symbol, digit
+
+    def replay(self, engine, symbols=None, start_epoch=None, end_epoch=None):
+        # Feeds markets into an engine interleaved in epoch order
+        symbols = symbols or self.markets()
+        streams = [self.tagged(symbol, start_epoch, end_epoch) for symbol in symbols]
+        count = 0
+        for epoch, symbol, digit in heapq.merge(*streams):
+            engine.on_tick(digit, symbol)
+            count += 1
+        return count
+
+    def close(self):
+        for segment in self.open_segments.values():
+            segment.close()
+        self.open_segments.clear()
@@ -0,0 +1,169 @@
+"""Vectorized NumPy evaluation of the differ strategy.
+
+Computes, for a whole digit array of one market, the same signals the
+streaming ``DifferEngine`` produces tick by tick: rolling digit counts, the
+rank of each tick's digit among the rarest, the pattern of each tick (from
+the same compiled ``patterns`` matcher) and the resulting trade signals,
+then settles them on the 5th following tick. Intermediate arrays are
+shared across a parameter grid, so a sweep costs a few boolean array ops
+per combination.
+
+Results match a single-market paper ``DifferEngine`` with unlimited
+``max_trades`` and enough balance to never skip a trade.
+"""
+
+import itertools
+
+import numpy as np
+
+from engine import CONTRACT_TICKS, PAPER_PROFIT_RATIO, PATTERN_HISTORY, TRADE_PATTERNS
+from patterns import MIXED, default_patterns
+
+CHUNK = 1 << 18
+
+DIGITS = np.arange(10, dtype=np.int32)
+
+
+def as_digits(digits):
+    if isinstance(digits, (bytes, bytearray, memoryview)):
+        return np.frombuffer(digits, dtype=np.uint8)
+    return np.asarray(digits, dtype=np.uint8)
+
+
+def rarest_rank(digits, window):
+    # Rank of each tick's digit among the digits seen in the trailing
+    # window (0 = rarest), ties broken towards the lower digit exactly like
+    # DigitStats.rarest. Processed in chunks to bound the (n, 10) counts.
+    digits = as_digits(digits)
+    n = len(digits)
+    rank = np.empty(n, dtype=np.int8)
+
+    for start in range(0, n, CHUNK):
+        stop = min(start + CHUNK, n)
+        lo = max(0, start - window + 1)
+        segment = digits[lo:stop].astype(np.int32)
+
+        cumulative = np.zeros((len(segment) + 1, 10), dtype=np.int32)
+        np.cumsum(segment[:, None] == DIGITS, axis=0, out=cumulative[1:])
+
+        local = np.arange(start - lo, stop - lo)
+        counts = cumulative[local + 1] - cumulative[np.maximum(local + 1 - window, 0)]
+
+        current = segment[local]
+        own = counts[np.arange(len(local)), current][:, None]
+        before = ((counts > 0) & (counts < own)) | ((counts == own) & (DIGITS < current[:, None]))
+        rank[start:stop] = before.sum(axis=1)
+
+    return rank
+
+
+def pattern_ids(digits, matcher):
+    # Pattern id of every tick, -1 before the matcher's window has filled;
+    # the register windows are rebuilt with one shifted OR per tick of age
+    digits = as_digits(digits)
+    n = len(digits)
+    if matcher.bits * matcher.length > 63:
+        raise ValueError("pattern window does not fit in 64 bits")
+
+    codes = np.asarray(matcher.codes, dtype=np.int64)[digits]
+    window = np.zeros(n, dtype=np.int64)
+    for age in range(min(matcher.length, n)):
+        window[age:] |= codes[:n - age] << (age * matcher.bits)
+
+    if matcher.table is not None:
+        ids = np.asarray(matcher.table, dtype=np.int32)[window]
+    else:
+        ids = np.full(n, MIXED, dtype=np.int32)
+        unmatched = np.ones(n, dtype=bool)
+        for mask, value, pattern_id in matcher.rules:
+            hit = unmatched & ((window & mask) == value)
+            ids[hit] = pattern_id
+            unmatched &= ~hit
+    ids[:matcher.length - 1] = -1
+    return ids
+
+
+def pattern_signal(digits, pattern_length, pattern_confirm, patterns=None,
+                   trade_patterns=TRADE_PATTERNS):
+    # should_trade's pattern half: enough classified ticks and the latest
+    # one is a tradeable pattern
+    patterns = patterns or default_patterns(pattern_length)
+    matcher = patterns.compile()
+    ids = pattern_ids(digits, matcher)
+    if pattern_confirm > PATTERN_HISTORY:
+        return np.zeros(len(ids), dtype=bool)
+    classified = np.arange(len(ids)) + 2 - matcher.length
+    tradeable = np.isin(ids, [patterns.id(name) for name in trade_patterns])
+    return tradeable & (classified >= pattern_confirm)
+
+
+def trade_signals(digits, rarity_window=20, rarest_count=2, pattern_length=5, pattern_confirm=3):
+    digits = as_digits(digits)
+    filled = np.arange(len(digits)) + 1 >= rarity_window
+    rank = rarest_rank(digits, rarity_window)
+    return filled & (rank < rarest_count) & pattern_signal(digits, pattern_length, pattern_confirm)
+
+
+def outcomes(digits):
+    # True where a contract opened on this tick wins (5th tick differs),
+    # False where it loses; ticks too close to the end never settle
+    digits = as_digits(digits)
+    settles = np.zeros(len(digits), dtype=bool)
+    wins = np.zeros(len(digits), dtype=bool)
+    settles[:-CONTRACT_TICKS] = True
+    wins[:-CONTRACT_TICKS] = digits[CONTRACT_TICKS:] != digits[:-CONTRACT_TICKS]
+    return settles, wins
+
+
+def settle(signals, settles, wins, stake=1.0):
+    traded = signals & settles
+    won = wins[traded]
+    # Sequential cumsum reproduces the engine's running float total
+    pnl = np.where(won, stake * PAPER_PROFIT_RATIO, -stake)
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    win_count = int(won.sum())
+    return {
+        'trades': int(signals.sum()),
+        'open': int((signals & ~settles).sum()),
+        'wins': win_count,
+        'losses': int(len(won) - win_count),
+        'win_rate': win_count / len(won) * 100 if len(won) else 0,
+        'profit_loss': float(equity[-1]) if len(equity) else 0.0,
+        'max_drawdown': float((peak - equity).max()) if len(equity) else 0.0
+    }
+
+
+def evaluate(digits, stake=1.0, **params):
+    digits = as_digits(digits)
+    settles, wins = outcomes(digits)
+    return settle(trade_signals(digits, **params), settles, wins, stake)
+
+
+def sweep(digits, rarity_windows=(20,), rarest_counts=(2,), pattern_lengths=(5,),
+          pattern_confirms=(3,), stake=1.0):
+    # One result row per parameter combination; ranks are computed once
+    # per window and pattern masks once per (length, confirm)
+    digits = as_digits(digits)
+    index = np.arange(len(digits))
+    settles, wins = outcomes(digits)
+
+    patterns = {(length, confirm): pattern_signal(digits, length, confirm)
+                for length, confirm in itertools.product(pattern_lengths, pattern_confirms)}
+
+    results = []
+    for window in rarity_windows:
+        filled = index + 1 >= window
+        rank = rarest_rank(digits, window)
+        for count in rarest_counts:
+            rare = filled & (rank < count)
+            for (length, confirm), pattern in patterns.items():
+                row = {
+                    'rarity_window': window,
+                    'rarest_count': count,
+                    'pattern_length': length,
+                    'pattern_confirm': confirm
+                }
+                row.update(settle(rare & pattern, settles, wins, stake))
+                results.append(row)
+    return results